@@ -0,0 +1,65 @@
+import hashlib
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import time
+
+from xarg import hasher
+
+SIZE_CLASSES = (4 * 1024, 64 * 1024, 1024**2, 16 * 1024**2, 128 * 1024**2)
+TOTAL = 256 * 1024**2  # bytes hashed per size class
+
+
+def serial(path: str, algorithm: str):
+    obj = hashlib.new(algorithm)
+    buffer = bytearray(1024**2)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as rhdl:
+        while True:
+            length = rhdl.readinto(buffer)
+            if not length:
+                break
+            obj.update(view[:length])
+
+
+def make_files(root: str, size: int):
+    paths = []
+    data = os.urandom(size)
+    for i in range(max(1, TOTAL // size)):
+        path = os.path.join(root, f"{size}-{i}")
+        with open(path, "wb") as whdl:
+            whdl.write(data)
+        paths.append(path)
+    return paths
+
+
+def bench(paths, name: str, func, rounds: int = 3):
+    best = 0.0
+    total = sum(os.path.getsize(path) for path in paths)
+    for _ in range(rounds):
+        start = time()
+        for path in paths:
+            func(path)
+        best = max(best, total / max(time() - start, 1e-9) / 1024**2)
+    print(f"{name:>10}: {best:8.1f} MB/s")
+
+
+def main():
+    algorithm = sys.argv[1] if len(sys.argv) > 1 else "sha256"
+    readers = {"overlap": hasher(),
+               "mmap": hasher(mmap_size=1),
+               "auto": hasher(overlap=False)}
+    with TemporaryDirectory() as thdl:
+        for size in SIZE_CLASSES:
+            print(f"{algorithm} {size // 1024} KiB files:")
+            paths = make_files(thdl, size)
+            bench(paths, "serial", lambda path: serial(path, algorithm))
+            for name, reader in readers.items():
+                bench(paths, name, lambda path, reader=reader: reader.update(
+                    path, hashlib.new(algorithm)))
+            for path in paths:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import time
+
+from xarg import scanner
+from xarg.scanner import ENGINES
+
+
+def make_tree(root: str, width: int = 10, depth: int = 3, files: int = 20):
+    if depth <= 0:
+        return
+    for i in range(files):
+        with open(os.path.join(root, f"file{i}"), "w", encoding="utf-8") as whdl:
+            whdl.write(str(i))
+    for i in range(width):
+        path = os.path.join(root, f"dir{i}")
+        os.mkdir(path)
+        make_tree(path, width, depth - 1, files)
+
+
+def bench(paths, engine: str, rounds: int = 3):
+    best = 0.0
+    count = 0
+    for _ in range(rounds):
+        start = time()
+        count = len(list(scanner.load(paths=paths, engine=engine)))
+        best = max(best, count / max(time() - start, 1e-9))
+    print(f"{engine:>8}: {count} entries, {best:.0f} entries/sec")
+
+
+def bench_paths(paths, rounds: int = 3):
+    files = [obj.path for obj in scanner.load(paths=paths)]
+    best = 0.0
+    for _ in range(rounds):
+        start = time()
+        count = len(scanner.load_paths(files))
+        best = max(best, count / max(time() - start, 1e-9))
+    print(f"{'paths':>8}: {len(files)} entries, {best:.0f} entries/sec")
+
+
+def main():
+    if len(sys.argv) > 1:
+        for engine in ENGINES:
+            bench(sys.argv[1:], engine)
+        bench_paths(sys.argv[1:])
+    else:
+        with TemporaryDirectory() as thdl:
+            make_tree(thdl)
+            for engine in ENGINES:
+                bench([thdl], engine)
+            bench_paths([thdl])
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,19 @@ from .actuator import commands  # noqa:F401
 from .actuator import end_command  # noqa:F401
 from .actuator import pre_command  # noqa:F401
 from .actuator import run_command  # noqa:F401
+from .archive import archive  # noqa:F401
 from .colorful import Back  # noqa:F401
 from .colorful import Fore  # noqa:F401
 from .colorful import Style  # noqa:F401
 from .colorful import color  # noqa:F401
+from .hashcache import hashcache  # noqa:F401
+from .hasher import hasher  # noqa:F401
+from .index import index  # noqa:F401
+from .inventory import inventory  # noqa:F401
+from .manifest import manifest  # noqa:F401
+from .matcher import matcher  # noqa:F401
 from .parser import argp  # noqa:F401
+from .predicate import predicate  # noqa:F401
 from .safefile import safile  # noqa:F401
 from .safefile import stfile  # noqa:F401
 from .scanner import scanner  # noqa:F401
@@ -21,8 +29,12 @@ from .sheet import tabulate  # noqa:F401
 from .sheet import xls_reader  # noqa:F401
 from .sheet import xls_writer  # noqa:F401
 from .sheet import xlsx  # noqa:F401
+from .thread import concurrency  # noqa:F401
 from .thread import task_job  # noqa:F401
 from .thread import task_pool  # noqa:F401
 from .thread import thread_executor  # noqa:F401
+from .thread import work_stealing  # noqa:F401
+from .usage import usage  # noqa:F401
 from .utils import chdir  # noqa:F401
 from .utils import singleton  # noqa:F401
+from .watcher import watcher  # noqa:F401
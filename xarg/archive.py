@@ -0,0 +1,370 @@
+# coding:utf-8
+
+from concurrent.futures import Future
+from concurrent.futures import as_completed
+from contextlib import contextmanager
+import hashlib
+import os
+import posixpath
+import stat
+import tarfile
+from time import mktime
+from typing import IO
+from typing import Dict
+from typing import Generator
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+import zipfile
+
+from .actuator import commands
+from .hasher import hasher
+from .scanner import HASH_CHUNK_SIZE
+from .scanner import THDNUM_DEFAULT
+from .scanner import THDNUM_MAXIMUM
+from .scanner import THDNUM_MINIMUM
+from .scanner import scanner
+from .thread import thread_executor
+
+ARCHIVE_TAR = "tar"
+ARCHIVE_ZIP = "zip"
+ARCHIVE_SUFFIXES = {".tar": ARCHIVE_TAR, ".tar.gz": ARCHIVE_TAR,
+                    ".tgz": ARCHIVE_TAR, ".tar.bz2": ARCHIVE_TAR,
+                    ".tbz2": ARCHIVE_TAR, ".tar.xz": ARCHIVE_TAR,
+                    ".txz": ARCHIVE_TAR, ".zip": ARCHIVE_ZIP}
+# file type bits of tar member types, others are regular files
+TAR_TYPES = {tarfile.DIRTYPE: stat.S_IFDIR, tarfile.SYMTYPE: stat.S_IFLNK,
+             tarfile.CHRTYPE: stat.S_IFCHR, tarfile.BLKTYPE: stat.S_IFBLK,
+             tarfile.FIFOTYPE: stat.S_IFIFO}
+
+
+class archive:
+    '''tar or zip file scanned as a virtual tree, nothing is extracted
+
+    Members are exposed as read-only entries that behave like
+    `scanner.object`, their paths are under the archive path (e.g.
+    "dist/pkg.tar.gz/pkg/setup.py"). Loading reads the archive once in
+    order (as a stream for compressed tar), member content is hashed as
+    it passes by. Hard link members of tar share the digests of their
+    target.
+    '''
+
+    class member:  # pylint: disable=too-many-public-methods
+        '''read-only view of an archive member'''
+
+        __slots__ = ("__archive", "__name", "__stat", "__linkname",
+                     "__digests")
+
+        def __init__(self, arch: "archive", name: str,
+                     result: os.stat_result, linkname: str = ""):
+            self.__archive: archive = arch
+            self.__name: str = name
+            self.__stat: os.stat_result = result
+            self.__linkname: str = linkname
+            self.__digests: Dict[str, str] = {}
+
+        def __repr__(self) -> str:
+            return f"archive.member({self.path!r})"
+
+        @property
+        def archive(self) -> "archive":
+            return self.__archive
+
+        @property
+        def name(self) -> str:
+            '''normalized member name in the archive'''
+            return self.__name
+
+        @property
+        def path(self) -> str:
+            return os.path.join(self.__archive.path, self.__name)
+
+        @property
+        def linkname(self) -> str:
+            '''target of symbolic or hard link, "" if not a link'''
+            return self.__linkname
+
+        @property
+        def stat(self) -> os.stat_result:
+            return self.__stat
+
+        @property
+        def lstat(self) -> os.stat_result:
+            return self.__stat
+
+        @property
+        def uid(self) -> int:
+            return self.__stat.st_uid
+
+        @property
+        def gid(self) -> int:
+            return self.__stat.st_gid
+
+        @property
+        def mode(self) -> int:
+            return self.__stat.st_mode
+
+        @property
+        def mtime(self) -> float:
+            return self.__stat.st_mtime
+
+        @property
+        def size(self) -> int:
+            return self.__stat.st_size
+
+        @property
+        def isdir(self) -> bool:
+            return stat.S_ISDIR(self.mode)
+
+        @property
+        def isreg(self) -> bool:
+            return stat.S_ISREG(self.mode)
+
+        @property
+        def isfile(self) -> bool:
+            return self.isreg
+
+        @property
+        def islink(self) -> bool:
+            return stat.S_ISLNK(self.mode)
+
+        @property
+        def issym(self) -> bool:
+            return self.islink
+
+        @property
+        def digests(self) -> Dict[str, str]:
+            '''computed digests, e.g. {"md5": "..."}'''
+            return self.__digests.copy()
+
+        def share_digests(self, digests: Dict[str, str]) -> None:
+            '''take digests computed while the archive is read'''
+            self.__digests.update(digests)
+
+        def digest(self, *algorithms: str,
+                   size: int = HASH_CHUNK_SIZE) -> Dict[str, str]:
+            '''digests of member content, missing ones are computed by
+            streaming the member out of the archive
+            '''
+            names = [name for name in algorithms
+                     if name not in self.__digests]
+            if names:
+                assert self.isfile and not self.issym
+                with self.__archive.open(self.__name) as fhandler:
+                    self.__digests.update(
+                        archive.hash(fhandler, names, size))
+            return {name: self.__digests[name] for name in algorithms}
+
+        @property
+        def md5(self) -> str:
+            return self.digest("md5")["md5"]
+
+        @property
+        def sha1(self) -> str:
+            return self.digest("sha1")["sha1"]
+
+        @property
+        def sha256(self) -> str:
+            return self.digest("sha256")["sha256"]
+
+    def __init__(self, path: str, kind: Optional[str] = None):
+        kind = kind or self.detect(path)
+        assert kind in (ARCHIVE_TAR, ARCHIVE_ZIP), \
+            f"'{path}' is not a tar or zip archive"
+        self.__path: str = os.path.normpath(path)
+        self.__kind: str = kind
+        self.__members: Dict[str, archive.member] = {}
+
+    def __iter__(self) -> Generator[member, None, None]:
+        return (member for member in self.__members.values())
+
+    def __getitem__(self, name: str) -> member:
+        return self.__members[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__members
+
+    def __len__(self) -> int:
+        return len(self.__members)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def kind(self) -> str:
+        '''"tar" or "zip"'''
+        return self.__kind
+
+    @property
+    def dirs(self) -> List[member]:
+        return [member for member in self if member.isdir]
+
+    @property
+    def files(self) -> List[member]:
+        return [member for member in self if member.isreg]
+
+    @property
+    def links(self) -> List[member]:
+        return [member for member in self if member.islink]
+
+    @classmethod
+    def is_archive(cls, path: str) -> bool:
+        '''tar or zip by name suffix, the file is not opened'''
+        name = path.lower()
+        return any(name.endswith(suffix) for suffix in ARCHIVE_SUFFIXES)
+
+    @classmethod
+    def detect(cls, path: str) -> Optional[str]:
+        '''archive kind by name suffix, or by content if unknown'''
+        name = path.lower()
+        for suffix, kind in ARCHIVE_SUFFIXES.items():
+            if name.endswith(suffix):
+                return kind
+        if zipfile.is_zipfile(path):
+            return ARCHIVE_ZIP
+        if tarfile.is_tarfile(path):
+            return ARCHIVE_TAR
+        return None
+
+    @classmethod
+    def normalize(cls, name: str) -> str:
+        '''member name without leading "/" or "./" and trailing "/"'''
+        return posixpath.normpath(name.lstrip("/")).replace("/", os.sep)
+
+    @classmethod
+    def hash(cls, fhandler: IO[bytes], algorithms: Sequence[str],
+             size: int = HASH_CHUNK_SIZE) -> Dict[str, str]:
+        '''read stream once and feed all hash objects'''
+        objs = [hashlib.new(name) for name in algorithms]
+        hasher.feed(fhandler, objs, bytearray(size))
+        return {name: obj.hexdigest() for name, obj in zip(algorithms, objs)}
+
+    @classmethod
+    def tar_stat(cls, info: tarfile.TarInfo) -> os.stat_result:
+        '''stat result of tar member (access and change time are 0)'''
+        return scanner.object.unpack_stat(
+            ((info.mode & 0o7777) | TAR_TYPES.get(info.type, stat.S_IFREG),
+             0, 0, 1, info.uid, info.gid, info.size, 0,
+             int(info.mtime * 10**9), 0, 0))
+
+    @classmethod
+    def zip_stat(cls, info: zipfile.ZipInfo) -> os.stat_result:
+        '''stat result of zip member (access and change time are 0)'''
+        mode = info.external_attr >> 16
+        if info.create_system != 3 or not stat.S_IFMT(mode):  # not unix
+            mode = stat.S_IFDIR | 0o755 if info.is_dir() \
+                else stat.S_IFREG | 0o644
+        mtime = int(mktime(info.date_time + (0, 0, -1)))  # local time
+        return scanner.object.unpack_stat(
+            (mode, 0, 0, 1, 0, 0, info.file_size, 0, mtime * 10**9, 0, 0))
+
+    @contextmanager
+    def open(self, name: str) -> Generator[IO[bytes], None, None]:
+        '''read content of a member, without extracting it'''
+        if self.__kind == ARCHIVE_ZIP:
+            with zipfile.ZipFile(self.__path) as zhdl:
+                for info in zhdl.infolist():
+                    if self.normalize(info.filename) == name:
+                        with zhdl.open(info) as fhandler:
+                            yield fhandler
+                        return
+        else:
+            with tarfile.open(self.__path, "r:*") as thdl:
+                for info in thdl:
+                    if self.normalize(info.name) == name:
+                        fhandler = thdl.extractfile(info)
+                        if fhandler is None:
+                            break
+                        with fhandler:
+                            yield fhandler
+                        return
+        raise FileNotFoundError(f"no member '{name}' in '{self.__path}'")
+
+    def __add(self, name: str, result: os.stat_result,
+              linkname: str = "") -> Optional[member]:
+        name = self.normalize(name)
+        if name == os.curdir:
+            return None
+        obj = archive.member(self, name, result, linkname)
+        self.__members[name] = obj
+        return obj
+
+    def __load_tar(self,  # pylint: disable=unused-private-member
+                   algorithms: Sequence[str], size: int):
+        # stream mode, compressed archives are decompressed once in order
+        with tarfile.open(self.__path, "r|*") as thdl:
+            for info in thdl:
+                obj = self.__add(info.name, self.tar_stat(info),
+                                 info.linkname)
+                if obj is None or not algorithms:
+                    continue
+                if info.islnk():  # the target is an earlier member
+                    target = self.__members.get(
+                        self.normalize(info.linkname))
+                    if target is not None:
+                        obj.share_digests(target.digests)
+                elif info.isreg():
+                    fhandler = thdl.extractfile(info)
+                    if fhandler is not None:
+                        with fhandler:
+                            obj.share_digests(
+                                self.hash(fhandler, algorithms, size))
+
+    def __load_zip(self,  # pylint: disable=unused-private-member
+                   algorithms: Sequence[str], size: int):
+        with zipfile.ZipFile(self.__path) as zhdl:
+            for info in zhdl.infolist():
+                obj = self.__add(info.filename, self.zip_stat(info))
+                if obj is None or not algorithms or not obj.isreg:
+                    continue
+                with zhdl.open(info) as fhandler:
+                    obj.share_digests(self.hash(fhandler, algorithms, size))
+
+    @classmethod
+    def load(cls, path: str, algorithms: Sequence[str] = (),
+             size: int = HASH_CHUNK_SIZE) -> "archive":
+        '''list members (and hash regular members) in one pass'''
+        for name in algorithms:
+            assert name in hashlib.algorithms_available, \
+                f"unknown hash algorithm '{name}'"
+        arch = archive(path)
+        if arch.kind == ARCHIVE_ZIP:
+            arch.__load_zip(algorithms, size)
+        else:
+            arch.__load_tar(algorithms, size)
+        return arch
+
+    @classmethod
+    def scan(cls,  # pylint: disable=R0913,R0917
+             paths: Iterable[str],
+             algorithms: Sequence[str] = (),
+             workers: int = THDNUM_DEFAULT,
+             size: int = HASH_CHUNK_SIZE
+             ) -> Generator["archive", None, None]:
+        '''load independent archives in parallel, yield them as they
+        complete, archives that cannot be read are logged and skipped
+
+        e.g. archives found by a scan:
+            archive.scan(obj.path for obj in objects.files
+                         if archive.is_archive(obj.path))
+        '''
+        cmds = commands()
+        thds = min(max(THDNUM_MINIMUM, workers), THDNUM_MAXIMUM)
+        with thread_executor(max_workers=thds,
+                             thread_name_prefix="xarg-archive") as executor:
+            pending: Dict[Future, str] = {
+                executor.submit(cls.load, path, algorithms, size): path
+                for path in paths}
+            try:
+                for future in as_completed(pending):
+                    try:
+                        yield future.result()
+                    except (OSError, EOFError, tarfile.TarError,
+                            zipfile.BadZipFile) as error:
+                        cmds.logger.warning("archive %s error: %s",
+                                            pending[future], error)
+            finally:  # stop early, e.g. the consumer breaks the loop
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,189 @@
+# coding:utf-8
+
+import os
+import sqlite3
+from threading import Lock
+from time import time
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+
+def default_cache_dir() -> str:
+    '''Unified cache directory, respect $XDG_CACHE_HOME
+    '''
+    base = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "xarg")
+
+
+class hashcache:  # pylint: disable=too-many-instance-attributes
+    '''Persistent content hash cache
+
+    Digests are stored in a sqlite database and keyed by the file stat
+    (st_dev, st_ino, st_size, st_mtime_ns) and the hash algorithm, so an
+    unchanged file returns its digest without being opened.
+
+    Writes (including access time updates of hits) are batched, the least
+    recently used entries are evicted if there are more than `max_entries`.
+    '''
+
+    KEY = Tuple[int, int, int, int, str]
+
+    def __init__(self, path: Optional[str] = None,
+                 max_entries: int = 10000000, batch: int = 1000):
+        assert max_entries > 0, f"invalid max entries {max_entries}"
+        assert batch > 0, f"invalid batch size {batch}"
+        if path is None:
+            path = os.path.join(default_cache_dir(), "hashcache.sqlite3")
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.__path: str = path
+        self.__lock: Lock = Lock()
+        self.__conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            path, check_same_thread=False)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        self.__conn.execute("CREATE TABLE IF NOT EXISTS digests ("
+                            "dev INTEGER, ino INTEGER, size INTEGER, "
+                            "mtime_ns INTEGER, algorithm TEXT, "
+                            "digest TEXT NOT NULL, atime INTEGER NOT NULL, "
+                            "PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)"
+                            ") WITHOUT ROWID")
+        self.__conn.execute("CREATE INDEX IF NOT EXISTS digests_atime "
+                            "ON digests (atime)")
+        self.__conn.commit()
+        self.__entries: int = self.__conn.execute(
+            "SELECT COUNT(*) FROM digests").fetchone()[0]
+        self.__max_entries: int = max_entries
+        self.__batch: int = batch
+        self.__writes: Dict[hashcache.KEY, str] = {}
+        self.__touches: Dict[hashcache.KEY, int] = {}
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__entries + len(self.__writes)
+
+    @property
+    def path(self) -> str:
+        '''database path'''
+        return self.__path
+
+    @property
+    def max_entries(self) -> int:
+        '''eviction threshold'''
+        return self.__max_entries
+
+    @property
+    def hits(self) -> int:
+        '''cache hit counter'''
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        '''cache miss counter'''
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        '''evicted entries counter'''
+        return self.__evictions
+
+    @classmethod
+    def key(cls, stat: os.stat_result, algorithm: str) -> KEY:
+        '''cache key of file stat and hash algorithm'''
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                algorithm)
+
+    def get(self, stat: os.stat_result, algorithm: str) -> Optional[str]:
+        '''lookup digest, return None if missed'''
+        key = self.key(stat, algorithm)
+        with self.__lock:
+            assert self.__conn is not None, "hash cache is closed"
+            digest = self.__writes.get(key)
+            if digest is None:
+                row = self.__conn.execute(
+                    "SELECT digest FROM digests WHERE dev=? AND ino=? AND "
+                    "size=? AND mtime_ns=? AND algorithm=?", key).fetchone()
+                if row is None:
+                    self.__misses += 1
+                    return None
+                digest = row[0]
+                self.__touches[key] = int(time())
+            self.__hits += 1
+            self.__flush(force=False)
+            return digest
+
+    def put(self, stat: os.stat_result, algorithm: str, digest: str):
+        '''store digest, written in batches'''
+        key = self.key(stat, algorithm)
+        with self.__lock:
+            assert self.__conn is not None, "hash cache is closed"
+            self.__writes[key] = digest
+            self.__flush(force=False)
+
+    def flush(self):
+        '''write all pending entries'''
+        with self.__lock:
+            if self.__conn is not None:
+                self.__flush(force=True)
+
+    def close(self):
+        '''flush and close database'''
+        with self.__lock:
+            if self.__conn is not None:
+                self.__flush(force=True)
+                self.__conn.close()
+                self.__conn = None
+
+    def clear(self):
+        '''delete all entries'''
+        with self.__lock:
+            assert self.__conn is not None, "hash cache is closed"
+            self.__writes.clear()
+            self.__touches.clear()
+            self.__conn.execute("DELETE FROM digests")
+            self.__conn.commit()
+            self.__entries = 0
+
+    def __flush(self, force: bool):
+        assert self.__conn is not None
+        if not force and len(self.__writes) + len(self.__touches) < self.__batch:  # noqa:E501
+            return
+        now = int(time())
+        with self.__conn:
+            if self.__writes:
+                cursor = self.__conn.executemany(
+                    "INSERT OR IGNORE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",  # noqa:E501
+                    (key + (digest, now) for key, digest in self.__writes.items()))  # noqa:E501
+                self.__entries += max(cursor.rowcount, 0)
+                self.__writes.clear()
+            if self.__touches:
+                self.__conn.executemany(
+                    "UPDATE digests SET atime=? WHERE dev=? AND ino=? AND "
+                    "size=? AND mtime_ns=? AND algorithm=?",
+                    ((atime,) + key for key, atime in self.__touches.items()))
+                self.__touches.clear()
+            if self.__entries > self.__max_entries:
+                self.__evict()
+
+    def __evict(self):
+        assert self.__conn is not None
+        # evict down to 90% to avoid evicting on every batch
+        count = self.__entries - self.__max_entries * 9 // 10
+        cursor = self.__conn.execute(
+            "DELETE FROM digests WHERE (dev, ino, size, mtime_ns, algorithm) "
+            "IN (SELECT dev, ino, size, mtime_ns, algorithm FROM digests "
+            "ORDER BY atime LIMIT ?)", (count,))
+        evicted = max(cursor.rowcount, 0)
+        self.__entries -= evicted
+        self.__evictions += evicted
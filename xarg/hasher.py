@@ -0,0 +1,241 @@
+# coding:utf-8
+
+import mmap
+import os
+from queue import Queue
+from threading import Thread
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+CHUNK_AUTO = 0
+CHUNK_MINIMUM = 64 * 1024
+CHUNK_MAXIMUM = 8 * 1024**2
+OVERLAP_SIZE = 8 * 1024**2  # smaller data is read in the calling thread
+
+
+class hasher:
+    '''double-buffered file hashing
+
+    A reader thread reads the next chunk into one buffer while the calling
+    thread hashes the other (hashlib and file reads release the GIL), the
+    kernel is told about sequential access by `posix_fadvise`. Files of at
+    least `mmap_size` bytes (0: disabled) are mapped instead of read.
+
+    Holes of sparse files are found by SEEK_DATA/SEEK_HOLE, they are not
+    read but hashed as zeros, digests are the same as reading the file.
+
+    A hasher owns its buffers, use one per thread.
+    '''
+
+    def __init__(self, chunk: int = CHUNK_AUTO, mmap_size: int = 0,
+                 overlap: bool = True, sparse: bool = True):
+        assert chunk >= 0, f"invalid chunk size {chunk}"
+        assert mmap_size >= 0, f"invalid mmap size {mmap_size}"
+        self.__chunk: int = chunk
+        self.__mmap_size: int = mmap_size
+        self.__overlap: bool = overlap
+        self.__sparse: bool = sparse
+        self.__buffers: List[bytearray] = []
+        self.__zeros: bytes = b""
+
+    @property
+    def chunk(self) -> int:
+        '''chunk size, 0 if auto-tuned by file size'''
+        return self.__chunk
+
+    @property
+    def mmap_size(self) -> int:
+        '''minimum file size to mmap, 0 if disabled'''
+        return self.__mmap_size
+
+    @classmethod
+    def auto_chunk(cls, size: int) -> int:
+        '''chunk size of about 1/16 file size (power of two), bounded'''
+        chunk = CHUNK_MINIMUM
+        while chunk < CHUNK_MAXIMUM and chunk * 16 < size:
+            chunk *= 2
+        return chunk
+
+    @classmethod
+    def advise(cls, fd: int, offset: int, length: int, advice: str):
+        '''posix_fadvise if available, e.g. "POSIX_FADV_SEQUENTIAL"'''
+        if hasattr(os, "posix_fadvise") and hasattr(os, advice):
+            try:
+                os.posix_fadvise(fd, offset, length, getattr(os, advice))
+            except OSError:
+                pass
+
+    @classmethod
+    def segments(cls, fd: int, size: int) -> List[Tuple[int, int, bool]]:
+        '''(offset, length, is data) of data and holes'''
+        if not hasattr(os, "SEEK_DATA") or not hasattr(os, "SEEK_HOLE"):
+            return [(0, size, True)]
+        segments: List[Tuple[int, int, bool]] = []
+        offset = 0
+        try:
+            while offset < size:
+                try:
+                    data = os.lseek(fd, offset, os.SEEK_DATA)
+                except OSError:  # ENXIO: hole up to the end
+                    data = size
+                data = min(data, size)
+                if data > offset:
+                    segments.append((offset, data - offset, False))
+                if data >= size:
+                    break
+                hole = min(os.lseek(fd, data, os.SEEK_HOLE), size)
+                segments.append((data, hole - data, True))
+                offset = hole
+        except OSError:  # not supported by the file system
+            return [(0, size, True)]
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+        return segments
+
+    @classmethod
+    def feed(cls, fhandler, objs: Sequence[Any], buffer: bytearray) -> int:
+        '''read stream up to the end through buffer, feed all hash
+        objects, return the number of bytes read
+        '''
+        view = memoryview(buffer)
+        total = 0
+        while True:
+            length = fhandler.readinto(buffer)
+            if not length:
+                break
+            data = view[:length]
+            for obj in objs:
+                obj.update(data)
+            total += length
+        return total
+
+    def __buffer(self, index: int, chunk: int) -> bytearray:
+        while len(self.__buffers) <= index:
+            self.__buffers.append(bytearray(0))
+        if len(self.__buffers[index]) < chunk:
+            self.__buffers[index] = bytearray(chunk)
+        return self.__buffers[index]
+
+    def __holes(self, objs: Sequence[Any], length: int, chunk: int):
+        if len(self.__zeros) < chunk:
+            self.__zeros = bytes(chunk)
+        zeros = memoryview(self.__zeros)
+        while length > 0:
+            data = zeros[:min(length, chunk)]
+            for obj in objs:
+                obj.update(data)
+            length -= len(data)
+
+    def __read(self, fhandler, objs: Sequence[Any], offset: int,
+               length: int, chunk: int):
+        fhandler.seek(offset)
+        view = memoryview(self.__buffer(0, chunk))
+        while length > 0:
+            count = fhandler.readinto(view[:min(length, chunk)])
+            if not count:
+                break
+            data = view[:count]
+            for obj in objs:
+                obj.update(data)
+            length -= count
+
+    def __overlap_read(self,  # pylint: disable=R0913,R0914,R0917
+                       fhandler, objs: Sequence[Any], offset: int,
+                       length: int, chunk: int):
+        views = [memoryview(self.__buffer(i, chunk)) for i in range(2)]
+        free: "Queue[int]" = Queue()
+        full: "Queue[Optional[Tuple[int, int]]]" = Queue()
+        errors: List[BaseException] = []
+        free.put(0)
+        free.put(1)
+
+        def reader():
+            position, remaining = offset, length
+            try:
+                fhandler.seek(position)
+                while remaining > 0:
+                    index = free.get()
+                    if index < 0:  # stopped by the hashing thread
+                        return
+                    count = fhandler.readinto(
+                        views[index][:min(remaining, chunk)])
+                    if not count:
+                        break
+                    position += count
+                    remaining -= count
+                    self.advise(fhandler.fileno(), position, chunk,
+                                "POSIX_FADV_WILLNEED")
+                    full.put((index, count))
+            except BaseException as error:  # pylint: disable=W0718
+                errors.append(error)
+            finally:
+                full.put(None)
+
+        thread = Thread(target=reader, name="xarg-read", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = full.get()
+                if item is None:
+                    break
+                index, count = item
+                data = views[index][:count]
+                for obj in objs:
+                    obj.update(data)
+                free.put(index)
+        finally:
+            free.put(-1)
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def __mmap_read(self, fd: int, objs: Sequence[Any],
+                    segments: List[Tuple[int, int, bool]], chunk: int):
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mapped) as view:
+                for offset, length, isdata in segments:
+                    if not isdata:
+                        self.__holes(objs, length, chunk)
+                        continue
+                    for start in range(offset, offset + length, chunk):
+                        end = min(start + chunk, offset + length)
+                        with view[start:end] as data:
+                            for obj in objs:
+                                obj.update(data)
+
+    def update_file(self, fhandler, *objs: Any) -> os.stat_result:
+        '''read opened file (unbuffered, at offset 0) once and feed all
+        hash objects, return the `os.fstat` of the hashed file
+        '''
+        fd = fhandler.fileno()
+        result = os.fstat(fd)
+        size = result.st_size
+        chunk = self.__chunk or self.auto_chunk(size)
+        self.advise(fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+        sparse = self.__sparse and size > 0 and \
+            getattr(result, "st_blocks", size) * 512 < size
+        segments = self.segments(fd, size) if sparse \
+            else [(0, size, True)]
+
+        if self.__mmap_size and size >= self.__mmap_size:
+            self.__mmap_read(fd, objs, segments, chunk)
+            return result
+
+        for offset, length, isdata in segments:
+            if not isdata:
+                self.__holes(objs, length, chunk)
+            elif self.__overlap and length >= max(OVERLAP_SIZE, chunk * 2):
+                self.__overlap_read(fhandler, objs, offset, length, chunk)
+            else:
+                self.__read(fhandler, objs, offset, length, chunk)
+        return result
+
+    def update(self, path: str, *objs: Any) -> int:
+        '''read file once and feed all hash objects, return file size'''
+        with open(path, "rb", buffering=0) as fhandler:
+            return self.update_file(fhandler, *objs).st_size
@@ -0,0 +1,165 @@
+# coding:utf-8
+
+from bisect import bisect_left
+from bisect import bisect_right
+import os
+import stat
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+KIND_FILE = "file"
+KIND_DIR = "dir"
+KIND_LINK = "link"
+KINDS = (KIND_FILE, KIND_DIR, KIND_LINK)
+
+
+class index:  # pylint: disable=too-many-instance-attributes
+    '''Secondary indexes of scanned objects
+
+    Built once from captured metadata (no stat calls are made later):
+    extension, uid, gid and type map to sets of entries, size and mtime
+    are sorted columns searched by bisect, paths are sorted for directory
+    prefix ranges. A query starts from the most selective condition and
+    checks the others against the columns.
+    '''
+
+    def __init__(self, objects: Iterable[Any]):
+        rows: List[Tuple[str, Any, os.stat_result, bool]] = []
+        for obj in objects:
+            try:
+                rows.append((obj.path, obj, obj.stat, obj.issym))
+            except OSError:
+                continue
+        rows.sort(key=lambda row: row[0])
+        self.__paths: List[str] = [row[0] for row in rows]
+        self.__objects: List[Any] = [row[1] for row in rows]
+        self.__modes: List[int] = [row[2].st_mode for row in rows]
+        self.__sizes: List[int] = [row[2].st_size for row in rows]
+        self.__mtimes: List[int] = [row[2].st_mtime_ns for row in rows]
+        self.__uids: List[int] = [row[2].st_uid for row in rows]
+        self.__gids: List[int] = [row[2].st_gid for row in rows]
+        self.__links: Set[int] = {i for i, row in enumerate(rows) if row[3]}
+        self.__exts: Dict[str, Set[int]] = {}
+        self.__uidmap: Dict[int, Set[int]] = {}
+        self.__gidmap: Dict[int, Set[int]] = {}
+        for i, path in enumerate(self.__paths):
+            self.__exts.setdefault(self.extension(path), set()).add(i)
+            self.__uidmap.setdefault(self.__uids[i], set()).add(i)
+            self.__gidmap.setdefault(self.__gids[i], set()).add(i)
+        self.__bysize: List[int] = sorted(range(len(rows)),
+                                          key=self.__sizes.__getitem__)
+        self.__sortsizes: List[int] = [self.__sizes[i] for i in self.__bysize]
+        self.__bymtime: List[int] = sorted(range(len(rows)),
+                                           key=self.__mtimes.__getitem__)
+        self.__sortmtimes: List[int] = [self.__mtimes[i]
+                                        for i in self.__bymtime]
+
+    def __len__(self) -> int:
+        return len(self.__paths)
+
+    @classmethod
+    def extension(cls, path: str) -> str:
+        '''lowercase extension without dot, e.g. "gz" of "a.tar.gz"'''
+        return os.path.splitext(path)[1][1:].lower()
+
+    def __under(self, path: str) -> Tuple[range, Callable[[int], bool]]:
+        path = os.path.relpath(path)
+        if path == os.curdir:  # scanned paths are relative
+            return range(len(self)), lambda i: not os.path.isabs(
+                self.__paths[i]) and self.__paths[i] != os.pardir and \
+                not self.__paths[i].startswith(os.pardir + os.sep)
+        prefix = path + os.sep
+        # names like "path-1" sort between path and its subtree
+        span = range(bisect_left(self.__paths, path),
+                     bisect_left(self.__paths, prefix + "\U0010ffff"))
+        return span, lambda i: \
+            self.__paths[i] == path or self.__paths[i].startswith(prefix)
+
+    @classmethod
+    def __range(cls, keys: List[int], low: Optional[int],
+                high: Optional[int]) -> range:
+        start = bisect_left(keys, low) if low is not None else 0
+        end = bisect_right(keys, high) if high is not None else len(keys)
+        return range(start, end)
+
+    def __kind(self, kind: str) -> Callable[[int], bool]:
+        assert kind in KINDS, f"unknown kind '{kind}'"
+        if kind == KIND_LINK:
+            return self.__links.__contains__
+        check = stat.S_ISDIR if kind == KIND_DIR else stat.S_ISREG
+        return lambda i: check(self.__modes[i])
+
+    def query(self,  # pylint: disable=R0912,R0913,R0914,R0917
+              ext: Optional[Union[str, Sequence[str]]] = None,
+              min_size: Optional[int] = None,
+              max_size: Optional[int] = None,
+              newer: Optional[float] = None,
+              older: Optional[float] = None,
+              uid: Optional[int] = None,
+              gid: Optional[int] = None,
+              under: Optional[str] = None,
+              kind: Optional[str] = None) -> List[Any]:
+        '''objects matching all given conditions, sorted by path
+
+        - ext: extension(s) without dot, case insensitive
+        - min_size, max_size: inclusive st_size range in bytes
+        - newer, older: inclusive st_mtime range in seconds
+        - uid, gid: owner ids
+        - under: directory path, includes the directory itself
+        - kind: "file", "dir" or "link"
+        '''
+        # (number of candidates, candidates, check of one entry)
+        conditions: List[Tuple[int, Iterable[int], Callable[[int], bool]]] = []  # noqa:E501
+
+        def add_set(ids: Set[int]):
+            conditions.append((len(ids), ids, ids.__contains__))
+
+        if ext is not None:
+            exts = (ext,) if isinstance(ext, str) else ext
+            ids: Set[int] = set()
+            for name in exts:
+                ids.update(self.__exts.get(name.lstrip(".").lower(), ()))
+            add_set(ids)
+        if uid is not None:
+            add_set(self.__uidmap.get(uid, set()))
+        if gid is not None:
+            add_set(self.__gidmap.get(gid, set()))
+        if min_size is not None or max_size is not None:
+            span = self.__range(self.__sortsizes, min_size, max_size)
+            conditions.append((len(span), map(self.__bysize.__getitem__, span),
+                               lambda i: (min_size is None or
+                                          self.__sizes[i] >= min_size) and
+                               (max_size is None or
+                                self.__sizes[i] <= max_size)))
+        if newer is not None or older is not None:
+            low = int(newer * 1e9) if newer is not None else None
+            high = int(older * 1e9) if older is not None else None
+            span = self.__range(self.__sortmtimes, low, high)
+            conditions.append((len(span),
+                               map(self.__bymtime.__getitem__, span),
+                               lambda i: (low is None or
+                                          self.__mtimes[i] >= low) and
+                               (high is None or self.__mtimes[i] <= high)))
+        if under is not None:
+            span, check = self.__under(under)
+            conditions.append((len(span), filter(check, span), check))
+        if kind is not None:
+            check = self.__kind(kind)
+            conditions.append((len(self), filter(check, range(len(self))),
+                               check))
+
+        if not conditions:
+            return list(self.__objects)
+        conditions.sort(key=lambda condition: condition[0])
+        _, ids, _ = conditions[0]
+        checks = [condition[2] for condition in conditions[1:]]
+        matched = sorted(i for i in ids if all(c(i) for c in checks))
+        return [self.__objects[i] for i in matched]
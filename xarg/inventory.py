@@ -0,0 +1,352 @@
+# coding:utf-8
+
+from array import array
+import os
+import stat
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from .scanner import THDNUM_DEFAULT
+from .scanner import scanner
+
+FLAG_ENTRY = 0x01  # not a placeholder of parent directory
+FLAG_LINK = 0x02  # symbolic link
+S_IFMT_MASK = 0o170000  # file type bits of st_mode
+
+
+class inventory:  # pylint: disable=too-many-instance-attributes
+    '''Compact columnar storage of scanned metadata
+
+    Path components are interned and each entry refers to its parent
+    directory by index, metadata is stored in `array` columns. Entries
+    are exposed as lightweight views that behave like `scanner.object`,
+    types are classified by bitmasks over the mode column.
+    '''
+
+    class entry:  # pylint: disable=too-many-public-methods
+        '''read-only view of an inventory entry'''
+
+        __slots__ = ("__inventory", "__index")
+
+        def __init__(self, inv: "inventory", index: int):
+            self.__inventory: inventory = inv
+            self.__index: int = index
+
+        def __eq__(self, other) -> bool:
+            return isinstance(other, inventory.entry) and \
+                self.__inventory is other.inventory and \
+                self.__index == other.index
+
+        def __hash__(self) -> int:
+            return hash((id(self.__inventory), self.__index))
+
+        @property
+        def inventory(self) -> "inventory":
+            return self.__inventory
+
+        @property
+        def index(self) -> int:
+            return self.__index
+
+        @property
+        def path(self) -> str:
+            return self.__inventory.path(self.__index)
+
+        @property
+        def abspath(self) -> str:
+            return os.path.abspath(self.path)
+
+        @property
+        def realpath(self) -> str:
+            return os.path.realpath(self.abspath)
+
+        @property
+        def stat(self) -> os.stat_result:
+            return self.__inventory.stat(self.__index)
+
+        @property
+        def uid(self) -> int:
+            return self.__inventory.uids[self.__index]
+
+        @property
+        def gid(self) -> int:
+            return self.__inventory.gids[self.__index]
+
+        @property
+        def mode(self) -> int:
+            return self.__inventory.modes[self.__index]
+
+        @property
+        def ino(self) -> int:
+            return self.__inventory.inodes[self.__index]
+
+        @property
+        def dev(self) -> int:
+            return self.__inventory.devices[self.__index]
+
+        @property
+        def mtime_ns(self) -> int:
+            return self.__inventory.mtimes[self.__index]
+
+        @property
+        def mtime(self) -> float:
+            return self.mtime_ns / 1e9
+
+        @property
+        def size(self) -> int:
+            return self.__inventory.sizes[self.__index]
+
+        @property
+        def isdir(self) -> bool:
+            return stat.S_ISDIR(self.mode)
+
+        @property
+        def isreg(self) -> bool:
+            return stat.S_ISREG(self.mode)
+
+        @property
+        def isfile(self) -> bool:
+            return self.isreg
+
+        @property
+        def islink(self) -> bool:
+            return bool(self.__inventory.flags[self.__index] & FLAG_LINK)
+
+        @property
+        def issym(self) -> bool:
+            return self.islink
+
+        @property
+        def object(self) -> scanner.object:
+            '''snapshot object with the captured metadata
+
+            Only the target of a symbolic link is captured, the link itself
+            is restored with the target metadata and a link mode.
+            '''
+            record: Dict[str, Any] = {
+                "path": self.path,
+                "stat": scanner.object.pack_stat(self.stat)}
+            if self.islink:
+                record["lstat"] = [stat.S_IFLNK | 0o777] + record["stat"][1:]
+            return scanner.object.from_record(record)
+
+        def digest(self, *algorithms: str, **kwargs) -> Dict[str, str]:
+            return self.object.digest(*algorithms, **kwargs)
+
+        @property
+        def md5(self) -> str:
+            return self.digest("md5")["md5"]
+
+        @property
+        def sha1(self) -> str:
+            return self.digest("sha1")["sha1"]
+
+        @property
+        def sha256(self) -> str:
+            return self.digest("sha256")["sha256"]
+
+    def __init__(self):
+        self.__names: List[str] = []
+        self.__nametable: Dict[str, int] = {}
+        # directories by (parent index, name id), packed in one integer
+        self.__dirindex: Dict[int, int] = {}
+        self.__lastdir: Tuple[str, int] = ("", -1)
+        self.__count: int = 0
+        self.__parents: array = array("q")
+        self.__nameids: array = array("I")
+        self.__flags: array = array("B")
+        self.__modes: array = array("I")
+        self.__uids: array = array("I")
+        self.__gids: array = array("I")
+        self.__sizes: array = array("q")
+        self.__mtimes: array = array("q")
+        self.__inodes: array = array("Q")
+        self.__devices: array = array("Q")
+
+    @property
+    def parents(self) -> array:
+        '''parent directory index of entries'''
+        return self.__parents
+
+    @property
+    def nameids(self) -> array:
+        '''interned name index of entries'''
+        return self.__nameids
+
+    @property
+    def flags(self) -> array:
+        '''entry and symbolic link flags'''
+        return self.__flags
+
+    @property
+    def modes(self) -> array:
+        '''st_mode column'''
+        return self.__modes
+
+    @property
+    def uids(self) -> array:
+        '''st_uid column'''
+        return self.__uids
+
+    @property
+    def gids(self) -> array:
+        '''st_gid column'''
+        return self.__gids
+
+    @property
+    def sizes(self) -> array:
+        '''st_size column'''
+        return self.__sizes
+
+    @property
+    def mtimes(self) -> array:
+        '''st_mtime_ns column'''
+        return self.__mtimes
+
+    @property
+    def inodes(self) -> array:
+        '''st_ino column'''
+        return self.__inodes
+
+    @property
+    def devices(self) -> array:
+        '''st_dev column'''
+        return self.__devices
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __iter__(self) -> Generator[entry, None, None]:
+        return (inventory.entry(self, index)
+                for index, flag in enumerate(self.flags)
+                if flag & FLAG_ENTRY)
+
+    def __intern(self, name: str) -> int:
+        nameid = self.__nametable.get(name)
+        if nameid is None:
+            nameid = len(self.__names)
+            self.__names.append(name)
+            self.__nametable[name] = nameid
+        return nameid
+
+    def __append(self, parent: int, name: str) -> int:
+        index = len(self.parents)
+        self.parents.append(parent)
+        self.nameids.append(self.__intern(name))
+        self.flags.append(0)
+        for column in (self.modes, self.uids, self.gids, self.sizes,
+                       self.mtimes, self.inodes, self.devices):
+            column.append(0)
+        return index
+
+    def __directory(self, path: str) -> int:
+        '''index of directory, create placeholder if not exists'''
+        if path == self.__lastdir[0]:  # e.g. files of the same directory
+            return self.__lastdir[1]
+        head, tail = os.path.split(path)
+        if not tail:  # e.g. "/"
+            parent, name = -1, path
+        elif not head or head == path:
+            parent, name = -1, tail
+        else:
+            parent, name = self.__directory(head), tail
+        key = (parent + 1) << 32 | self.__intern(name)
+        index = self.__dirindex.get(key)
+        if index is None:
+            index = self.__append(parent, name)
+            self.__dirindex[key] = index
+        self.__lastdir = (path, index)
+        return index
+
+    def add(self, obj: scanner.object):
+        '''append captured metadata of object
+
+        Directories are deduplicated by path, other objects are appended
+        as is, do not add them twice.
+        '''
+        assert isinstance(obj, scanner.object)
+        path = obj.path
+        result = obj.stat
+        if stat.S_ISDIR(result.st_mode):
+            index = self.__directory(path)
+            if self.flags[index] & FLAG_ENTRY:
+                return
+        else:
+            head, tail = os.path.split(path)
+            parent = self.__directory(head) if head and tail else -1
+            index = self.__append(parent, tail if parent >= 0 else path)
+        self.flags[index] = FLAG_ENTRY | (FLAG_LINK if obj.islink else 0)
+        self.modes[index] = result.st_mode
+        self.uids[index] = result.st_uid
+        self.gids[index] = result.st_gid
+        self.sizes[index] = result.st_size
+        self.mtimes[index] = result.st_mtime_ns
+        self.inodes[index] = result.st_ino
+        self.devices[index] = result.st_dev
+        self.__count += 1
+
+    def path(self, index: int) -> str:
+        '''rebuild path from interned components'''
+        names: List[str] = []
+        while index >= 0:
+            names.append(self.__names[self.nameids[index]])
+            index = self.parents[index]
+        return os.path.join(*reversed(names))
+
+    def stat(self, index: int) -> os.stat_result:
+        '''rebuild stat result from columns (access and change time are 0)
+        '''
+        return scanner.object.unpack_stat(
+            (self.modes[index], self.inodes[index], self.devices[index], 1,
+             self.uids[index], self.gids[index], self.sizes[index], 0,
+             self.mtimes[index], 0, 0))
+
+    def __select(self, fmt: int) -> Generator[entry, None, None]:
+        return (inventory.entry(self, index)
+                for index, mode in enumerate(self.modes)
+                if (mode & S_IFMT_MASK) == fmt and
+                self.flags[index] & FLAG_ENTRY)
+
+    @property
+    def dirs(self) -> Generator[entry, None, None]:
+        return self.__select(stat.S_IFDIR)
+
+    @property
+    def files(self) -> Generator[entry, None, None]:
+        return self.__select(stat.S_IFREG)
+
+    @property
+    def links(self) -> Generator[entry, None, None]:
+        return (inventory.entry(self, index)
+                for index, flag in enumerate(self.flags)
+                if flag & FLAG_LINK)
+
+    @classmethod
+    def from_scanner(cls, objects: scanner) -> "inventory":
+        inv = inventory()
+        for obj in objects:
+            inv.add(obj)
+        return inv
+
+    @classmethod
+    def load(cls,  # pylint: disable=R0913,R0917
+             paths: Sequence[str],
+             exclude: Optional[Sequence[str]] = None,
+             linkdir: bool = True,
+             threads: int = THDNUM_DEFAULT,
+             handler: Optional[Callable[[scanner.object], bool]] = None
+             ) -> "inventory":
+        '''scan paths into compact storage, objects are not kept
+        '''
+        inv = inventory()
+        for obj in scanner.iterate(paths=paths, exclude=exclude,
+                                   linkdir=linkdir, threads=threads,
+                                   handler=handler):
+            inv.add(obj)
+        return inv
@@ -0,0 +1,181 @@
+# coding:utf-8
+
+import os
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .hashcache import hashcache
+from .scanner import THDNUM_DEFAULT
+from .scanner import scanner
+
+# hex digest length of *sum tools
+ALGORITHMS = {32: "md5", 40: "sha1", 56: "sha224", 64: "sha256",
+              96: "sha384", 128: "sha512"}
+
+
+class manifest:
+    '''checksum manifest in `sha256sum`/`md5sum` format
+
+    Each line is "<hex digest>  <path>" ("*" before the path in binary
+    mode), a line of a path with backslash or newline starts with "\\" and
+    the path is escaped as coreutils does.
+    '''
+
+    class report:  # pylint: disable=too-few-public-methods
+        '''result of verification'''
+
+        def __init__(self, total: int):
+            self.total: int = total
+            self.ok: List[str] = []
+            self.failed: List[str] = []
+            self.missing: List[str] = []
+            self.stopped: bool = False
+
+        def __bool__(self) -> bool:
+            return not self.stopped and not self.failed and not self.missing
+
+    @classmethod
+    def escape(cls, path: str) -> Tuple[str, str]:
+        '''(line prefix, escaped path)'''
+        if "\\" not in path and "\n" not in path and "\r" not in path:
+            return "", path
+        return "\\", path.replace("\\", "\\\\").replace(
+            "\n", "\\n").replace("\r", "\\r")
+
+    @classmethod
+    def unescape(cls, path: str) -> str:
+        chars: List[str] = []
+        index = 0
+        while index < len(path):
+            char = path[index]
+            if char == "\\" and index + 1 < len(path):
+                index += 1
+                char = {"n": "\n", "r": "\r"}.get(path[index], path[index])
+            chars.append(char)
+            index += 1
+        return "".join(chars)
+
+    @classmethod
+    def algorithm(cls, digest: str) -> str:
+        '''guess hash algorithm by hex digest length'''
+        assert len(digest) in ALGORITHMS, f"unknown digest '{digest}'"
+        return ALGORITHMS[len(digest)]
+
+    @classmethod
+    def dump(cls, path: str,
+             results: Iterable[Tuple[scanner.object, Dict[str, str]]],
+             algorithm: str = "sha256"):
+        '''write hash results (see `scanner.hash_objects()`) sorted by path
+
+        The manifest is written to a temporary file and then renamed.
+        '''
+        lines: List[Tuple[str, str]] = []
+        for obj, digests in results:
+            prefix, name = cls.escape(obj.path)
+            lines.append((obj.path, f"{prefix}{digests[algorithm]}  {name}\n"))
+        lines.sort()
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8", newline="\n") as whdl:
+            whdl.writelines(line for _, line in lines)
+        os.replace(temp, path)
+
+    @classmethod
+    def create(cls,  # pylint: disable=R0913,R0917
+               path: str,
+               objects: Iterable[scanner.object],
+               algorithm: str = "sha256",
+               workers: int = THDNUM_DEFAULT,
+               cache: Optional[hashcache] = None):
+        '''hash regular files in parallel and write manifest'''
+        cls.dump(path, scanner.hash_objects(objects, (algorithm,), workers,
+                                            cache=cache), algorithm)
+
+    @classmethod
+    def parse(cls, path: str) -> List[Tuple[str, str]]:
+        '''(hex digest, path) of each line'''
+        entries: List[Tuple[str, str]] = []
+        with open(path, "r", encoding="utf-8", newline="\n") as rhdl:
+            for number, line in enumerate(rhdl, start=1):
+                line = line.rstrip("\n")
+                if not line:
+                    continue
+                escaped = line.startswith("\\")
+                if escaped:
+                    line = line[1:]
+                digest, sep, name = line.partition(" ")
+                assert sep and name[:1] in (" ", "*"), \
+                    f"invalid line {number} in '{path}'"
+                name = name[1:]
+                entries.append((digest.lower(),
+                                cls.unescape(name) if escaped else name))
+        return entries
+
+    @classmethod
+    def verify(cls,  # pylint: disable=R0912,R0913,R0914,R0917
+               path: str,
+               algorithm: Optional[str] = None,
+               workers: int = THDNUM_DEFAULT,
+               fail_fast: bool = True,
+               progress: Optional[Callable[[int, int], None]] = None,
+               cache: Optional[hashcache] = None) -> "manifest.report":
+        '''verify files listed in manifest in parallel
+
+        Files are hashed in (st_dev, st_ino) order, which follows the disk
+        layout on most file systems. Digests of unchanged files are taken
+        from the `cache`. `progress` is called with (done, total) after
+        each file, verification stops at the first mismatch or missing
+        file if `fail_fast` is True.
+        '''
+        entries = cls.parse(path)
+        report = manifest.report(len(entries))
+        if not entries:
+            return report
+        if algorithm is None:
+            algorithm = cls.algorithm(entries[0][0])
+
+        # (name, expected digest) of objects, links are resolved as *sum
+        expected: Dict[scanner.object, Tuple[str, str]] = {}
+        objects: List[Tuple[Tuple[int, int], scanner.object]] = []
+        for digest, name in entries:
+            obj = scanner.object(name)
+            try:
+                if obj.islink:
+                    obj = scanner.object(os.path.realpath(name))
+                result = obj.stat
+                if not obj.isfile:
+                    raise IsADirectoryError(name)
+            except OSError:
+                report.missing.append(name)
+                if fail_fast:
+                    report.stopped = True
+                    return report
+                continue
+            expected[obj] = (name, digest)
+            objects.append(((result.st_dev, result.st_ino), obj))
+        objects.sort(key=lambda item: item[0])
+
+        done = len(report.missing)
+        results = scanner.hash_objects((obj for _, obj in objects),
+                                       (algorithm,), workers, cache=cache)
+        try:
+            for obj, digests in results:
+                done += 1
+                name, digest = expected.pop(obj)
+                if digests[algorithm] == digest:
+                    report.ok.append(name)
+                else:
+                    report.failed.append(name)
+                if progress is not None:
+                    progress(done, report.total)
+                if report.failed and fail_fast:
+                    report.stopped = True
+                    break
+        finally:
+            results.close()
+        if not report.stopped:  # files could not be read
+            report.missing.extend(name for name, _ in expected.values())
+        return report
@@ -0,0 +1,92 @@
+# coding:utf-8
+
+import os
+import re
+from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+
+class matcher:
+    '''match excluded paths
+
+    Glob and regular expression patterns are compiled into one regular
+    expression, exact paths are looked up in a set:
+        - "re:<regex>": regular expression searched in relative path
+        - glob (contains "*", "?" or "["): "**" matches any number of
+          directories, a pattern without "/" matches the name, e.g.
+          "**/.git", "*.tmp", "build/**/cache"
+        - others: exact path (relative to current working directory)
+    '''
+
+    GLOB_CHARS = ("*", "?", "[")
+
+    def __init__(self, patterns: Sequence[str]):
+        self.__patterns: Tuple[str, ...] = tuple(patterns)
+        self.__paths: Set[str] = set()
+        regexes: List[str] = []
+        for pattern in patterns:
+            if pattern.startswith("re:"):
+                regexes.append(pattern[3:])
+            elif any(char in pattern for char in self.GLOB_CHARS):
+                regexes.append(self.translate(pattern))
+            else:
+                self.__paths.add(os.path.relpath(pattern))
+        self.__regex: Optional[Pattern[str]] = re.compile(
+            "|".join(f"(?:{regex})" for regex in regexes)) \
+            if regexes else None
+
+    def __bool__(self) -> bool:
+        return bool(self.__paths) or self.__regex is not None
+
+    def __contains__(self, path: str) -> bool:
+        if path in self.__paths:
+            return True
+        if self.__regex is None:
+            return False
+        if os.sep != "/":
+            path = path.replace(os.sep, "/")
+        return self.__regex.search(path) is not None
+
+    @property
+    def patterns(self) -> Tuple[str, ...]:
+        return self.__patterns
+
+    @classmethod
+    def translate(cls, pattern: str) -> str:
+        '''translate glob pattern to anchored regular expression
+        '''
+        # pattern without "/" matches the name in any directory
+        regex = "(?:^|/)" if "/" not in pattern else "^"
+        index = 0
+        while index < len(pattern):
+            char = pattern[index]
+            index += 1
+            if char == "*":
+                if pattern.startswith("*", index):
+                    index += 1
+                    if pattern.startswith("/", index):
+                        index += 1
+                        regex += "(?:.*/)?"
+                    else:
+                        regex += ".*"
+                else:
+                    regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[":
+                end = pattern.find("]", index + 1)
+                if end < 0:
+                    regex += re.escape(char)
+                    continue
+                chars = pattern[index:end].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += f"[{chars}]"
+                index = end + 1
+            else:
+                regex += re.escape(char)
+        return regex + "$"
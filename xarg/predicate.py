@@ -0,0 +1,123 @@
+# coding:utf-8
+
+from fnmatch import translate
+import os
+import re
+import stat
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Sequence
+from typing import Union
+
+from .index import KIND_DIR
+from .index import KIND_FILE
+from .index import KIND_LINK
+from .index import KINDS
+
+
+class predicate:  # pylint: disable=too-many-instance-attributes
+    '''find-style filter evaluated by the walker
+
+    - kind: "file", "dir" or "link" (symbolic links are not followed)
+    - min_size, max_size: inclusive st_size range in bytes
+    - newer, older: inclusive st_mtime range in seconds
+    - cnewer, colder: inclusive st_ctime range in seconds
+    - uid, gid: owner ids
+    - name: glob(s) of the name, case sensitive
+    - maxdepth: do not descend below this depth (roots are 0)
+    - xdev: do not descend directories on other file systems
+
+    Entries are checked with `os.DirEntry` data before objects are built,
+    the name and kind need no stat call. Only `maxdepth` and `xdev` prune
+    subtrees, directories not matching the other conditions are walked
+    but not yielded.
+    '''
+
+    def __init__(self,  # pylint: disable=R0913,R0917
+                 kind: Optional[str] = None,
+                 min_size: Optional[int] = None,
+                 max_size: Optional[int] = None,
+                 newer: Optional[float] = None,
+                 older: Optional[float] = None,
+                 cnewer: Optional[float] = None,
+                 colder: Optional[float] = None,
+                 uid: Optional[int] = None,
+                 gid: Optional[int] = None,
+                 name: Optional[Union[str, Sequence[str]]] = None,
+                 maxdepth: Optional[int] = None,
+                 xdev: bool = False):
+        assert kind is None or kind in KINDS, f"unknown kind '{kind}'"
+        assert maxdepth is None or maxdepth >= 0, \
+            f"invalid max depth {maxdepth}"
+
+        def ns(seconds: Optional[float]) -> Optional[int]:
+            return int(seconds * 1e9) if seconds is not None else None
+
+        names = (name,) if isinstance(name, str) else name
+        self.__kind: Optional[str] = kind
+        self.__name: Optional[Pattern[str]] = re.compile("|".join(
+            translate(glob) for glob in names)) if names else None
+        self.__maxdepth: Optional[int] = maxdepth
+        self.__xdev: bool = xdev
+        # (stat field, low, high) conditions
+        self.__ranges: List[tuple] = [
+            (field, low, high) for field, low, high in (
+                ("st_size", min_size, max_size),
+                ("st_mtime_ns", ns(newer), ns(older)),
+                ("st_ctime_ns", ns(cnewer), ns(colder)),
+                ("st_uid", uid, uid),
+                ("st_gid", gid, gid))
+            if low is not None or high is not None]
+
+    @property
+    def maxdepth(self) -> Optional[int]:
+        return self.__maxdepth
+
+    @property
+    def xdev(self) -> bool:
+        return self.__xdev
+
+    def descend(self, depth: int) -> bool:
+        '''list a directory at depth?'''
+        return self.__maxdepth is None or depth < self.__maxdepth
+
+    def __check(self, name: str,  # pylint: disable=R0911
+                islink: bool,
+                fmt: Callable[[], int],
+                result: Callable[[], os.stat_result]) -> bool:
+        if self.__name is not None and not self.__name.match(name):
+            return False
+        if self.__kind == KIND_LINK and not islink:
+            return False
+        if self.__kind in (KIND_FILE, KIND_DIR):
+            check = stat.S_ISDIR if self.__kind == KIND_DIR else stat.S_ISREG
+            if islink or not check(fmt()):
+                return False
+        if not self.__ranges:
+            return True
+        try:
+            values = result()
+        except OSError:
+            return False
+        for field, low, high in self.__ranges:
+            value = getattr(values, field)
+            if (low is not None and value < low) or \
+                    (high is not None and value > high):
+                return False
+        return True
+
+    def match_entry(self, entry: os.DirEntry) -> bool:
+        '''check a directory entry, stat only if needed'''
+        return self.__check(
+            entry.name, entry.is_symlink(),
+            lambda: stat.S_IFDIR if entry.is_dir(follow_symlinks=False)
+            else stat.S_IFREG if entry.is_file(follow_symlinks=False)
+            else entry.stat(follow_symlinks=False).st_mode, entry.stat)
+
+    def match(self, obj: Any) -> bool:
+        '''check a `scanner.object`'''
+        return self.__check(os.path.basename(obj.path), obj.islink,
+                            lambda: obj.stat.st_mode, lambda: obj.stat)
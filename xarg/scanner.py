@@ -1,41 +1,114 @@
 # coding:utf-8
+# pylint: disable=too-many-lines
 
-from hashlib import md5
-from hashlib import sha1
-from hashlib import sha256
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import Future
+from concurrent.futures import wait
+import hashlib
+import heapq
+from itertools import islice
+import json
+import marshal
 import os
 from queue import Empty
 from queue import Queue
 import stat
+from threading import Lock
 from threading import Thread
 from threading import current_thread
+from threading import local
+from time import perf_counter
+from typing import Any
+from typing import AsyncGenerator
 from typing import Callable
+from typing import Deque
 from typing import Dict
 from typing import Generator
+from typing import IO
+from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import Sequence
 from typing import Set
+from typing import Tuple
+from typing import Union
 
 from .actuator import commands
+from .hasher import hasher
+from .hashcache import hashcache
+from .index import index
+from .matcher import matcher
+from .predicate import predicate
+from .thread import concurrency
+from .thread import thread_executor
+from .thread import work_stealing
 
 CPU_COUNT = os.cpu_count()
 THDNUM_MINIMUM = 1
 THDNUM_MAXIMUM = CPU_COUNT if isinstance(CPU_COUNT, int) else 64
 THDNUM_DEFAULT = int(THDNUM_MAXIMUM / 2)
+THDNUM_AUTO = -1  # adapt worker threads at runtime, see `concurrency`
+THDNUM_AUTO_MAXIMUM = 64
+PROCESSES_DEFAULT = CPU_COUNT if isinstance(CPU_COUNT, int) else 1
 
+ENGINE_SCANDIR = "scandir"
+ENGINE_LISTDIR = "listdir"
+ENGINES = (ENGINE_SCANDIR, ENGINE_LISTDIR)
 
-class scanner:
+QUEUE_SIZE_DEFAULT = 1024
+SCAN_BATCH_SIZE = 256
+SHARD_BATCH_SIZE = 65536
+SHARD_DEPTH = 4
+
+SNAPSHOT_FORMAT = "xarg-scanner"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BUFFER = 1024**2
+
+HASH_CHUNK_SIZE = 1024**2
+HASH_PARTIAL_SIZE = 4096
+
+
+class scanner:  # pylint: disable=R0902,R0904
     '''scan objects
     '''
 
-    class object:  # pylint: disable=too-many-public-methods
+    class object:  # pylint: disable=R0902,R0904
+        '''scan object
+
+        In snapshot mode (default), stat is called at most once per object
+        and the result is cached, the `os.DirEntry` stat data is reused if
+        the object is created by the walker. Call `refresh()` to stat again
+        immediately, or `invalidate()` to stat again on next access.
+        '''
+
+        __slots__ = ("__path", "__abspath", "__realpath", "__entry",
+                     "__stat", "__lstat", "__snapshot", "__digests")
+
+        # opt-in persistent digest cache, e.g. `hashcache()`
+        digest_cache: Optional[hashcache] = None
+
+        # stat fields captured in records
+        STAT_FIELDS = ("st_mode", "st_ino", "st_dev", "st_nlink", "st_uid",
+                       "st_gid", "st_size", "st_atime_ns", "st_mtime_ns",
+                       "st_ctime_ns", "st_blocks")
 
-        def __init__(self, path: str):
+        def __init__(self, path: str, entry: Optional[os.DirEntry] = None,
+                     snapshot: bool = True):
             assert isinstance(path, str)
-            self.__path = os.path.normpath(path)
-            self.__abspath = os.path.abspath(self.__path)
-            self.__realpath = os.path.realpath(self.__abspath)
+            assert isinstance(snapshot, bool)
+            self.__path: str = os.path.normpath(path)
+            self.__abspath: Optional[str] = None
+            self.__realpath: Optional[str] = None
+            self.__entry: Optional[os.DirEntry] = entry
+            self.__stat: Optional[os.stat_result] = None
+            self.__lstat: Optional[os.stat_result] = None
+            self.__snapshot: bool = snapshot
+            self.__digests: Dict[str, str] = {}
 
         @property
         def path(self) -> str:
@@ -43,19 +116,109 @@ class scanner:
 
         @property
         def abspath(self) -> str:
+            if self.__abspath is None:
+                self.__abspath = os.path.abspath(self.__path)
             return self.__abspath
 
         @property
         def realpath(self) -> str:
+            if self.__realpath is None:
+                self.__realpath = os.path.realpath(self.abspath)
             return self.__realpath
 
+        @property
+        def snapshot(self) -> bool:
+            '''cache stat result or not
+            '''
+            return self.__snapshot
+
         @property
         def stat(self) -> os.stat_result:
-            return os.stat(self.abspath)
+            if not self.__snapshot:
+                return os.stat(self.__path)
+            if self.__stat is None:
+                lstat = self.lstat
+                if not stat.S_ISLNK(lstat.st_mode):
+                    self.__stat = lstat
+                elif self.__entry is not None:
+                    self.__stat = self.__entry.stat(follow_symlinks=True)
+                else:
+                    self.__stat = os.stat(self.__path)
+                self.__entry = None
+            return self.__stat
 
         @property
         def lstat(self) -> os.stat_result:
-            return os.lstat(self.abspath)
+            if not self.__snapshot:
+                return os.lstat(self.__path)
+            if self.__lstat is None:
+                self.__lstat = os.lstat(self.__path) if self.__entry is None \
+                    else self.__entry.stat(follow_symlinks=False)
+            return self.__lstat
+
+        def refresh(self) -> "scanner.object":
+            '''stat again immediately and update the snapshot
+            '''
+            self.invalidate()
+            if self.__snapshot:
+                self.__lstat = os.lstat(self.__path)
+                self.__stat = self.__lstat \
+                    if not stat.S_ISLNK(self.__lstat.st_mode) \
+                    else os.stat(self.__path)
+            return self
+
+        def invalidate(self) -> None:
+            '''drop the snapshot, stat again on next access
+            '''
+            self.__entry = None
+            self.__stat = None
+            self.__lstat = None
+            self.__digests = {}
+
+        @classmethod
+        def pack_stat(cls, result: os.stat_result) -> List[int]:
+            return [getattr(result, field, 0) for field in cls.STAT_FIELDS]
+
+        @classmethod
+        def unpack_stat(cls, values: Sequence[int]) -> os.stat_result:
+            fields = dict(zip(cls.STAT_FIELDS, values))
+            seconds = {f"st_{t}time": fields[f"st_{t}time_ns"] / 1e9
+                       for t in ("a", "m", "c")}
+            return os.stat_result(
+                tuple(fields[field] for field in cls.STAT_FIELDS[:7]) +
+                tuple(int(seconds[f"st_{t}time"]) for t in ("a", "m", "c")),
+                dict(seconds, **fields))
+
+        @property
+        def record(self) -> Dict[str, Any]:
+            '''captured metadata (and computed digests) for serialization
+            '''
+            record: Dict[str, Any] = {"path": self.path,
+                                      "stat": self.pack_stat(self.stat)}
+            if self.islink:
+                record["lstat"] = self.pack_stat(self.lstat)
+            if self.__digests:
+                record["digests"] = self.__digests.copy()
+            return record
+
+        @classmethod
+        def from_record(cls, record: Dict[str, Any]) -> "scanner.object":
+            '''rebuild a snapshot object without file system access
+            '''
+            result = cls.unpack_stat(record["stat"])
+            obj = cls(record["path"])
+            obj.__restore(result, cls.unpack_stat(record["lstat"])
+                          if "lstat" in record else result,
+                          record.get("digests", {}))
+            return obj
+
+        def __restore(self,  # pylint: disable=unused-private-member
+                      result: os.stat_result, lresult: os.stat_result,
+                      digests: Dict[str, str]):
+            self.__entry = None
+            self.__stat = result
+            self.__lstat = lresult
+            self.__digests = dict(digests)
 
         @property
         def uid(self) -> int:
@@ -93,6 +256,18 @@ class scanner:
         def size(self) -> int:
             return self.stat.st_size
 
+        @property
+        def inode(self) -> Tuple[int, int]:
+            '''(st_dev, st_ino), hard links share the inode and content
+            '''
+            return self.stat.st_dev, self.stat.st_ino
+
+        @property
+        def nlink(self) -> int:
+            '''number of hard links
+            '''
+            return self.stat.st_nlink
+
         @property
         def isdir(self) -> bool:
             return stat.S_ISDIR(self.stat.st_mode)
@@ -113,38 +288,129 @@ class scanner:
         def issym(self) -> bool:
             return self.islink
 
-        def hash(self, *args, size=1024**2) -> Generator[str, None, None]:
-            assert self.isfile and not self.issym
-            with open(self.abspath, "rb") as fhandler:
-                while True:
-                    data = fhandler.read(size)
-                    if not data:
-                        break
-                    for obj in args:
-                        obj.update(data)
+        def hash(self, *args, size: int = HASH_CHUNK_SIZE,
+                 buffer: Optional[bytearray] = None,
+                 reader: Optional[hasher] = None
+                 ) -> Generator[str, None, None]:
+            '''read file once and feed all hash objects
+
+            The file is read into a reusable buffer, pass `buffer` to share
+            it between calls (the `size` is ignored then). With a `reader`,
+            reads overlap hashing (see `hasher`).
+            '''
+            self.__read(args, size, buffer, reader)
             return (obj.hexdigest() for obj in args)
 
+        def __read(self, objs: Sequence[Any], size: int,
+                   buffer: Optional[bytearray],
+                   reader: Optional[hasher]) -> os.stat_result:
+            '''feed hash objects, return `os.fstat` of the hashed file'''
+            assert self.isfile and not self.issym
+            with open(self.path, "rb", buffering=0) as fhandler:
+                if reader is not None:
+                    return reader.update_file(fhandler, *objs)
+                result = os.fstat(fhandler.fileno())
+                hasher.feed(fhandler, objs,
+                            bytearray(size) if buffer is None else buffer)
+            return result
+
+        @property
+        def digests(self) -> Dict[str, str]:
+            '''computed digests, e.g. {"md5": "..."}
+            '''
+            return self.__digests.copy()
+
+        def share_digests(self, digests: Dict[str, str]) -> None:
+            '''take digests computed by another link of the same inode
+            '''
+            if self.__snapshot:
+                self.__digests.update(digests)
+
+        def digest(self, *algorithms: str, size: int = HASH_CHUNK_SIZE,
+                   buffer: Optional[bytearray] = None,
+                   cache: Optional[hashcache] = None,
+                   reader: Optional[hasher] = None) -> Dict[str, str]:
+            '''hash file once for all algorithms (hashlib names)
+
+            In snapshot mode digests are cached until `refresh()` or
+            `invalidate()`, only missing algorithms are computed.
+
+            Digests are also looked up in and stored to the persistent
+            `cache`, or `digest_cache` if not specified. They are stored
+            under the stat of the file as it is read, not the snapshot.
+            '''
+            if cache is None:
+                cache = self.digest_cache
+            digests = {name: self.__digests[name] for name in algorithms
+                       if self.__snapshot and name in self.__digests}
+            names = [name for name in algorithms if name not in digests]
+            if names and cache is not None:
+                for name in names:
+                    code = cache.get(self.stat, name)
+                    if code is not None:
+                        digests[name] = code
+                names = [name for name in names if name not in digests]
+            if names:
+                objs = [hashlib.new(name) for name in names]
+                result = self.__read(objs, size, buffer, reader)
+                for name, obj in zip(names, objs):
+                    digests[name] = obj.hexdigest()
+                    if cache is not None:
+                        cache.put(result, name, digests[name])
+            if self.__snapshot:
+                self.__digests.update(digests)
+            return {name: digests[name] for name in algorithms}
+
         @property
         def md5(self) -> str:
-            code, = self.hash(md5())
-            return code
+            return self.digest("md5")["md5"]
 
         @property
         def sha1(self) -> str:
-            code, = self.hash(sha1())
-            return code
+            return self.digest("sha1")["sha1"]
 
         @property
         def sha256(self) -> str:
-            code, = self.hash(sha256())
-            return code
+            return self.digest("sha256")["sha256"]
+
+        def partial_digest(self, algorithm: str = "md5",
+                           size: int = HASH_PARTIAL_SIZE) -> str:
+            '''digest of the first and last `size` bytes
+
+            The whole file is hashed if it is not larger than `size * 2`.
+            '''
+            assert self.isfile and not self.issym
+            obj = hashlib.new(algorithm)
+            with open(self.path, "rb", buffering=0) as fhandler:
+                obj.update(fhandler.read(size))
+                if self.size > size:
+                    fhandler.seek(max(size, self.size - size))
+                    obj.update(fhandler.read(size))
+            return obj.hexdigest()
+
+    class changes:  # pylint: disable=too-few-public-methods
+        '''added, removed and modified objects between two scans
+        '''
+
+        def __init__(self):
+            self.added: List[scanner.object] = []
+            self.removed: List[scanner.object] = []
+            self.modified: List[scanner.object] = []
+            self.content: List[scanner.object] = []
+
+        def __bool__(self) -> bool:
+            return bool(self.added or self.removed or self.modified or
+                        self.content)
 
-    def __init__(self):
+    def __init__(self, roots: Sequence[str] = ()):
+        self.__roots: Tuple[str, ...] = tuple(roots)
         self.__objdict: Dict[str, scanner.object] = {}
         self.__objects: Set[scanner.object] = set()
         self.__objsyms: Set[scanner.object] = set()
         self.__objregs: Set[scanner.object] = set()
         self.__objdirs: Set[scanner.object] = set()
+        self.__index: Optional[index] = None
+        self.__inodes: Optional[Dict[Tuple[int, int], List[scanner.object]]] = None  # noqa:E501
 
     def __iter__(self):
         return iter(self.__objects)
@@ -152,6 +418,18 @@ class scanner:
     def __getitem__(self, key: str):
         return self.__objdict[key]
 
+    def __contains__(self, key: str) -> bool:
+        return key in self.__objdict
+
+    def __len__(self) -> int:
+        return len(self.__objdict)
+
+    @property
+    def roots(self) -> Tuple[str, ...]:
+        '''scanned paths
+        '''
+        return self.__roots
+
     @property
     def dirs(self) -> Set[object]:
         return self.__objdirs
@@ -164,9 +442,303 @@ class scanner:
     def links(self) -> Set[object]:
         return self.__objsyms
 
+    @property
+    def indexes(self) -> index:
+        '''secondary indexes, built once on first use (or after `add()`)
+        '''
+        if self.__index is None:
+            self.__index = index(self.__objects)
+        return self.__index
+
+    def query(self,  # pylint: disable=R0913,R0917
+              ext: Optional[Union[str, Sequence[str]]] = None,
+              min_size: Optional[int] = None,
+              max_size: Optional[int] = None,
+              newer: Optional[float] = None,
+              older: Optional[float] = None,
+              uid: Optional[int] = None,
+              gid: Optional[int] = None,
+              under: Optional[str] = None,
+              kind: Optional[str] = None) -> List[object]:
+        '''objects matching all conditions by indexes, see `index.query()`
+
+        e.g. files over 1 GB under "data" modified in the last 7 days:
+            query(min_size=1024**3, under="data", newer=time() - 7 * 86400,
+                  kind="file")
+        '''
+        return self.indexes.query(ext=ext, min_size=min_size,
+                                  max_size=max_size, newer=newer, older=older,
+                                  uid=uid, gid=gid, under=under, kind=kind)
+
+    @property
+    def inodes(self) -> Dict[Tuple[int, int], List[object]]:
+        '''regular files grouped by inode (hard links), built once on
+        first use (or after `add()`), symbolic links are not included
+        '''
+        if self.__inodes is None:
+            inodes: Dict[Tuple[int, int], List[scanner.object]] = {}
+            for obj in self.__objregs:
+                if not obj.issym:
+                    inodes.setdefault(obj.inode, []).append(obj)
+            self.__inodes = inodes
+        return self.__inodes
+
+    def total_size(self, hardlink: bool = True) -> int:
+        '''apparent size of regular files, each inode counted once if
+        `hardlink` is True (as du)
+        '''
+        if hardlink:
+            return sum(objs[0].size for objs in self.inodes.values())
+        return sum(obj.size for obj in self.__objregs if not obj.issym)
+
+    @classmethod
+    def hash_objects(cls,  # pylint: disable=R0912,R0913,R0914,R0915,R0917
+                     objects: Iterable[object],
+                     algorithms: Sequence[str] = ("md5",),
+                     workers: int = THDNUM_DEFAULT,
+                     size: int = HASH_CHUNK_SIZE,
+                     cache: Optional[hashcache] = None,
+                     mmap_size: int = 0,
+                     hardlink: bool = True
+                     ) -> Generator[Tuple[object, Dict[str, str]], None, None]:  # noqa:E501
+        '''hash regular files in parallel
+
+        Each file is read once for all algorithms, results are yielded as
+        they complete. Symbolic links are skipped, files that cannot be
+        read are logged and skipped. Unchanged files are not opened if
+        their digests are found in the persistent `cache`.
+
+        Files are read by double-buffered `hasher` of chunk `size` (0 to
+        tune by file size), files of at least `mmap_size` are mapped.
+
+        If `hardlink` is True, each inode is read once, every link of it
+        is still yielded with the shared digests.
+        '''
+        for name in algorithms:
+            assert name in hashlib.algorithms_available, \
+                f"unknown hash algorithm '{name}'"
+
+        cmds = commands()
+        thds = min(max(THDNUM_MINIMUM, workers), THDNUM_MAXIMUM)
+        readers = local()
+
+        def task_hash(obj: scanner.object) -> Dict[str, str]:
+            reader: Optional[hasher] = getattr(readers, "reader", None)
+            if reader is None:
+                reader = hasher(chunk=size, mmap_size=mmap_size)
+                readers.reader = reader
+            return obj.digest(*algorithms, cache=cache, reader=reader)
+
+        # links waiting for the pending hash of their inode, and digests
+        # of hashed inodes with more links (nlink > 1)
+        waiting: Dict[Tuple[int, int], List[scanner.object]] = {}
+        hashed: Dict[Tuple[int, int], Dict[str, str]] = {}
+
+        def linked(obj: scanner.object) -> Optional[Tuple[int, int]]:
+            return obj.inode if hardlink and obj.nlink > 1 else None
+
+        with thread_executor(max_workers=thds,
+                             thread_name_prefix="xarg-hash") as executor:
+            pending: Dict[Future, scanner.object] = {}
+            iterator = iter(objects)
+            try:
+                while True:
+                    # bounded submission, do not queue every file at once
+                    for obj in iterator:
+                        try:
+                            if obj.issym or not obj.isfile:
+                                continue
+                            inode = linked(obj)
+                        except OSError as error:  # e.g. removed
+                            cmds.logger.warning("hash %s error: %s",
+                                                obj.path, error)
+                            continue
+                        if inode in hashed:
+                            obj.share_digests(hashed[inode])
+                            yield obj, hashed[inode].copy()
+                            continue
+                        if inode in waiting:
+                            waiting[inode].append(obj)
+                            continue
+                        if inode is not None:
+                            waiting[inode] = []
+                        pending[executor.submit(task_hash, obj)] = obj
+                        if len(pending) >= thds * 4:
+                            break
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        obj = pending.pop(future)
+                        inode = linked(obj)
+                        links = waiting.pop(inode, []) \
+                            if inode is not None else []
+                        try:
+                            digests = future.result()
+                        except OSError as error:
+                            for link in [obj] + links:
+                                cmds.logger.warning("hash %s error: %s",
+                                                    link.path, error)
+                            continue
+                        yield obj, digests
+                        if inode is not None:
+                            hashed[inode] = digests
+                        for link in links:
+                            link.share_digests(digests)
+                            yield link, digests.copy()
+            finally:  # stop early, e.g. the consumer breaks the loop
+                for future in pending:
+                    future.cancel()
+                if cache is not None:
+                    cache.flush()
+
+    def hash_files(self,  # pylint: disable=R0913,R0917
+                   algorithms: Sequence[str] = ("md5",),
+                   workers: int = THDNUM_DEFAULT,
+                   size: int = HASH_CHUNK_SIZE,
+                   cache: Optional[hashcache] = None,
+                   mmap_size: int = 0,
+                   hardlink: bool = True
+                   ) -> Generator[Tuple[object, Dict[str, str]], None, None]:
+        '''hash all regular files in parallel, see `hash_objects()`
+        '''
+        return self.hash_objects(self.files, algorithms, workers, size, cache,
+                                 mmap_size, hardlink)
+
+    @classmethod
+    def duplicate_objects(cls,  # pylint: disable=R0912,R0913,R0914,R0915,R0917
+                          objects: Iterable[object],
+                          algorithm: str = "sha256",
+                          partial: int = HASH_PARTIAL_SIZE,
+                          workers: int = THDNUM_DEFAULT,
+                          hardlink: bool = True,
+                          cache: Optional[hashcache] = None
+                          ) -> Generator[List[object], None, None]:
+        '''find duplicate regular files in stages
+
+        1. group files by size, only sizes with collisions go on
+        2. compare digests of the first and last `partial` bytes
+        3. full hash the files which still collide
+
+        Partial and full hashes run concurrently on a thread pool, each
+        group of duplicates is yielded as soon as its full hashes are done.
+        If `hardlink` is True, files sharing an inode are counted once,
+        only the first path of each inode is in the groups.
+        '''
+        assert algorithm in hashlib.algorithms_available, \
+            f"unknown hash algorithm '{algorithm}'"
+        assert partial > 0, f"invalid partial size {partial}"
+
+        cmds = commands()
+        thds = min(max(THDNUM_MINIMUM, workers), THDNUM_MAXIMUM)
+        readers = local()
+
+        class task_group:  # pylint: disable=too-few-public-methods
+
+            def __init__(self, objs: List[scanner.object], final: bool):
+                self.final: bool = final
+                self.remaining: int = len(objs)
+                self.digests: Dict[str, List[scanner.object]] = {}
+
+        def task_partial(obj: scanner.object) -> str:
+            return obj.partial_digest(algorithm, partial)
+
+        def task_full(obj: scanner.object) -> str:
+            reader: Optional[hasher] = getattr(readers, "reader", None)
+            if reader is None:
+                reader = hasher(chunk=HASH_CHUNK_SIZE)
+                readers.reader = reader
+            return obj.digest(algorithm, cache=cache, reader=reader)[algorithm]
+
+        # stage 1: group by size, no file content is read
+        inodes: Set[Tuple[int, int]] = set()
+        sizes: Dict[int, List[scanner.object]] = {}
+        for obj in objects:
+            try:
+                if obj.issym or not obj.isfile:
+                    continue
+                if hardlink:
+                    inode = obj.inode
+                    if inode in inodes:
+                        continue
+                    inodes.add(inode)
+                sizes.setdefault(obj.size, []).append(obj)
+            except OSError as error:
+                cmds.logger.warning("stat %s error: %s", obj.path, error)
+        del inodes
+
+        todo: Deque[Tuple[Callable[[scanner.object], str], scanner.object, task_group]] = deque()  # noqa:E501
+
+        def schedule(stage: Callable[[scanner.object], str],
+                     objs: List[scanner.object], final: bool):
+            group = task_group(objs, final)
+            if stage is task_full:  # finish started groups first
+                todo.extendleft((stage, obj, group) for obj in objs)
+            else:
+                todo.extend((stage, obj, group) for obj in objs)
+
+        for size, objs in sizes.items():
+            if len(objs) < 2:
+                continue
+            if size == 0:
+                yield objs
+                continue
+            # partial digest is the full digest of small files
+            schedule(task_partial, objs, final=size <= partial * 2)
+        del sizes
+
+        with thread_executor(max_workers=thds,
+                             thread_name_prefix="xarg-dedup") as executor:
+            pending: Dict[Future, Tuple[scanner.object, task_group]] = {}
+            try:
+                while todo or pending:
+                    while todo and len(pending) < thds * 4:
+                        stage, obj, group = todo.popleft()
+                        future = executor.submit(stage, obj)
+                        pending[future] = (obj, group)
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        obj, group = pending.pop(future)
+                        group.remaining -= 1
+                        try:
+                            group.digests.setdefault(future.result(),
+                                                     []).append(obj)
+                        except OSError as error:
+                            cmds.logger.warning("hash %s error: %s",
+                                                obj.path, error)
+                        if group.remaining > 0:
+                            continue
+                        for objs in group.digests.values():
+                            if len(objs) < 2:
+                                continue
+                            if not group.final:
+                                schedule(task_full, objs, final=True)
+                                continue
+                            yield objs
+                        group.digests.clear()
+            finally:  # stop early, e.g. the consumer breaks the loop
+                for future in pending:
+                    future.cancel()
+                todo.clear()
+                if cache is not None:
+                    cache.flush()
+
+    def duplicate_files(self, algorithm: str = "sha256",
+                        partial: int = HASH_PARTIAL_SIZE,
+                        workers: int = THDNUM_DEFAULT,
+                        hardlink: bool = True,
+                        cache: Optional[hashcache] = None
+                        ) -> Generator[List[object], None, None]:
+        '''find duplicate regular files, see `duplicate_objects()`
+        '''
+        return self.duplicate_objects(self.files, algorithm, partial,
+                                      workers, hardlink, cache)
+
     def add(self, obj: object):
         assert isinstance(obj, scanner.object)
         if obj.path not in self.__objdict:
+            self.__index = None
+            self.__inodes = None
             self.__objdict[obj.path] = obj
             self.__objects.add(obj)
             if obj.issym:
@@ -176,13 +748,43 @@ class scanner:
             elif obj.isreg:
                 self.__objregs.add(obj)
 
+    def remove(self, path: str) -> Optional[object]:
+        '''remove object of path, return the removed object or None
+        '''
+        obj = self.__objdict.pop(path, None)
+        if obj is not None:
+            self.__index = None
+            self.__inodes = None
+            for objects in (self.__objects, self.__objsyms, self.__objregs,
+                            self.__objdirs):
+                objects.discard(obj)
+        return obj
+
     @classmethod
-    def load(cls,  # pylint: disable=R0913,R0914,R0915,R0917
+    def walk(cls,  # pylint: disable=R0912,R0913,R0914,R0915,R0917
              paths: Sequence[str],
              exclude: Optional[Sequence[str]] = None,
              linkdir: bool = True,
              threads: int = THDNUM_DEFAULT,
-             handler: Optional[Callable[[object], bool]] = None):
+             handler: Optional[Callable[[object], bool]] = None,
+             qsize: int = QUEUE_SIZE_DEFAULT,
+             previous: Optional["scanner"] = None,
+             restat: bool = False,
+             revisit: Optional[Callable[[object, str], None]] = None,
+             batch: int = SCAN_BATCH_SIZE,
+             where: Optional[predicate] = None
+             ) -> Generator[List[object], None, None]:
+        '''scan paths and yield batches of objects, see `iterate()`
+
+        Each worker thread collects objects in a local batch, a batch is
+        handed over when it reaches `batch` objects, or when the worker
+        exits if `batch` is 0 (all batches are merged once at the end).
+
+        If `threads` is THDNUM_AUTO, up to THDNUM_AUTO_MAXIMUM workers are
+        started and the active count is tuned during the walk by the
+        measured entries/sec, per-entry latency and queued entries (see
+        `concurrency`), the chosen count is logged.
+        '''
         if exclude is None:
             exclude = []
 
@@ -190,30 +792,1020 @@ class scanner:
         assert isinstance(exclude, Sequence)
         assert isinstance(linkdir, bool)
         assert isinstance(threads, int)
+        assert isinstance(qsize, int) and qsize > 0
+        assert isinstance(restat, bool)
+        assert isinstance(batch, int) and batch >= 0
+        assert where is None or isinstance(where, predicate)
+
+        if len(paths) == 0:
+            return
+
+        children: Dict[str, List[scanner.object]] = {}
+        if previous is not None:
+            for obj in previous:
+                # top-level entries of root "." are under "." (not "")
+                parent = os.path.dirname(obj.path) or os.curdir
+                if parent != obj.path:
+                    children.setdefault(parent, []).append(obj)
 
         cmds = commands()
-        thds = min(max(THDNUM_MINIMUM, threads), THDNUM_MAXIMUM)
+        tuner: Optional[concurrency] = None
+        if threads == THDNUM_AUTO:
+            tuner = concurrency(initial=THDNUM_DEFAULT,
+                                minimum=THDNUM_MINIMUM,
+                                maximum=THDNUM_AUTO_MAXIMUM,
+                                name="scan threads")
+            thds = THDNUM_AUTO_MAXIMUM
+        else:
+            thds = min(max(THDNUM_MINIMUM, threads), THDNUM_MAXIMUM)
 
-        def rpath(path: str) -> str:
-            assert isinstance(path, str)
-            return os.path.relpath(path)
+        class task_stat:  # pylint: disable=R0902,R0903
+
+            def __init__(self):
+                self.lock = Lock()
+                self.local = local()
+                self.visited: Dict[Tuple[int, int], str] = {}
+                # symbolic link dirs, walked after the real dirs
+                self.links: List[Tuple[str, scanner.object, int,
+                                       Optional[int]]] = []
+                self.handler = handler
+                self.filter: matcher = cls.path_filter(exclude)
+                # batches of objects, None if a worker exits
+                self.q_task: "Queue[Optional[List[scanner.object]]]" = \
+                    Queue(maxsize=max(1, qsize // batch) if batch else 0)
+
+        scan_stat = task_stat()
+
+        def task_start():
+            cmds.logger.debug("task thread[%s] start", current_thread().name)
+            scan_stat.local.batch = []
+
+        def task_exit():
+            if scan_stat.local.batch:
+                scan_stat.q_task.put(scan_stat.local.batch)
+            scan_stat.q_task.put(None)  # notice the consumer
+            cmds.logger.debug("task thread[%s] exit", current_thread().name)
+
+        def task_scan_entry(item: Tuple[str, Any, int, Optional[int]]):
+            # entry: None (top-level path), os.DirEntry or scanner.object
+            # depth: 0 of top-level path, dev: st_dev of top-level path
+            path, entry, depth, dev = item
+            start = perf_counter()
+            try:
+                obj = scan_entry(path, entry, depth, dev)
+            except OSError as error:
+                cmds.logger.warning("scan %s error: %s", path, error)
+                return
+            finally:
+                if tuner is not None:  # stat and listdir latency
+                    tuner.record(perf_counter() - start)
+
+            if obj is None:
+                return
+
+            objs: List[scanner.object] = scan_stat.local.batch
+            objs.append(obj)
+            if batch and len(objs) >= batch:
+                scan_stat.local.batch = []
+                scan_stat.q_task.put(objs)
+
+        def wanted(sub: Any) -> bool:
+            '''check entries before they are queued, keep walkable dirs
+            '''
+            if where is None:
+                return True
+            if isinstance(sub, os.DirEntry):
+                if (linkdir or not sub.is_symlink()) and sub.is_dir():
+                    return True
+                return where.match_entry(sub)
+            if (linkdir or not sub.islink) and sub.isdir:
+                return True
+            return where.match(sub)
+
+        def unchanged_dir(obj: scanner.object) -> Optional[List[scanner.object]]:  # noqa:E501
+            if previous is None or obj.path not in previous:
+                return None
+            old: os.stat_result = previous[obj.path].stat
+            new: os.stat_result = obj.stat
+            if (old.st_dev, old.st_ino, old.st_mtime_ns) != \
+                    (new.st_dev, new.st_ino, new.st_mtime_ns):
+                return None
+            # directories are always stat'ed, their entries may be changed
+            return [scanner.object(sub.path) if restat or sub.isdir else sub
+                    for sub in children.get(obj.path, [])
+                    if sub.path not in scan_stat.filter]
+
+        def visit(obj: scanner.object) -> Optional[str]:
+            '''return the first path if the directory is visited
+            '''
+            key = (obj.stat.st_dev, obj.stat.st_ino)
+            with scan_stat.lock:
+                first = scan_stat.visited.get(key)
+                if first is None:
+                    scan_stat.visited[key] = obj.path
+                    return None
+            if (obj.path + os.sep).startswith(first + os.sep):
+                cmds.logger.info("scan loop %s (%s)", obj.path, first)
+            else:
+                cmds.logger.debug("scan revisit %s (%s)", obj.path, first)
+            if revisit is not None:
+                revisit(obj, first)
+            return first
+
+        def listing(obj: scanner.object, path: str, depth: int,
+                    dev: Optional[int]) -> List[Tuple[str, Any, int,
+                                                      Optional[int]]]:
+            subs = unchanged_dir(obj)
+            if subs is None:
+                # prune excluded entries before they are queued, paths
+                # are normalized as objects (e.g. "./a" of root ".")
+                with os.scandir(path) as entries:
+                    subs = [sub for sub in entries
+                            if os.path.normpath(sub.path)
+                            not in scan_stat.filter]
+            return [(os.path.normpath(sub.path), sub, depth + 1, dev)
+                    for sub in subs if wanted(sub)]
+
+        def scan_entry(path: str,  # pylint: disable=R0912
+                       entry: Any, depth: int,
+                       dev: Optional[int]) -> Optional[scanner.object]:
+            if entry is None:  # top-level path
+                path = cls.rpath(path)
+                if path in scan_stat.filter or not os.path.exists(path):
+                    cmds.logger.debug("scan filter %s", path)
+                    return None
+
+            obj = entry if isinstance(entry, scanner.object) \
+                else scanner.object(path, entry)
+
+            if entry is None and where is not None and where.xdev:
+                dev = obj.stat.st_dev
+
+            if not isinstance(entry, os.DirEntry):
+                isdir = obj.isdir
+            elif entry.is_symlink():
+                try:  # drop broken symbolic link as listdir engine
+                    isdir = stat.S_ISDIR(obj.stat.st_mode)
+                except FileNotFoundError:
+                    cmds.logger.debug("scan filter %s", path)
+                    return None
+            else:
+                isdir = entry.is_dir(follow_symlinks=False)
+
+            # scan symbolic link dirs?
+            walkable = isdir and (linkdir or not obj.islink)
+            if walkable and where is not None:  # prune by depth and xdev
+                walkable = where.descend(depth) and \
+                    (dev is None or obj.stat.st_dev == dev)
+            if walkable and obj.islink:  # the next phase
+                with scan_stat.lock:
+                    scan_stat.links.append((path, obj, depth, dev))
+            elif walkable and visit(obj) is None:
+                scheduler.extend(listing(obj, path, depth, dev))
+
+            # other entries are checked before they are queued
+            if where is not None and (entry is None or isdir) and not (
+                    where.match_entry(entry) if isinstance(entry, os.DirEntry)
+                    else where.match(obj)):
+                return None
+
+            if isinstance(scan_stat.handler, Callable):
+                ret = scan_stat.handler(obj)
+                assert isinstance(ret, bool)
+                if ret is not True:
+                    return None
+
+            obj.stat  # pylint: disable=W0104  # take snapshot in worker
+            return obj
 
-        # filter files and directorys
-        def path_filter() -> Set[str]:
-            filter_paths: Set[str] = set()
+        def consume(scheduler: work_stealing
+                    ) -> Generator[List[scanner.object], None, None]:
+            exits: int = 0
+            try:
+                while exits < thds:
+                    if tuner is None:
+                        objs = scan_stat.q_task.get()
+                    else:
+                        scheduler.resize(tuner.adjust(scheduler.pending))
+                        try:
+                            objs = scan_stat.q_task.get(
+                                timeout=tuner.interval)
+                        except Empty:
+                            continue
+                    if objs is None:
+                        exits += 1
+                        continue
+                    yield objs
+            finally:
+                if exits < thds:  # stop early, e.g. the consumer breaks
+                    scheduler.stop()
+                    while exits < thds:
+                        if scan_stat.q_task.get() is None:
+                            exits += 1
+                scheduler.join()
 
-            for path in exclude:
-                filter_paths.add(rpath(path))
+        items: List[Tuple[str, Any, int, Optional[int]]] = [
+            (path, None, 0, None) for path in paths]
+        try:
+            while items:
+                scheduler = work_stealing(target=task_scan_entry,
+                                          workers=thds, name="xarg-scan",
+                                          initializer=task_start,
+                                          finalizer=task_exit)
+                if tuner is not None:
+                    scheduler.resize(tuner.active)
+                scheduler.startup()
+                scheduler.extend(items)
+                yield from consume(scheduler)
 
-            return filter_paths
+                # the dirs of this phase have claimed their inodes, symbolic
+                # link dirs are claimed in path order and walked next phase
+                items = []
+                for path, obj, depth, dev in sorted(scan_stat.links,
+                                                    key=lambda x: x[0]):
+                    if visit(obj) is not None:
+                        continue
+                    try:
+                        items.extend(listing(obj, path, depth, dev))
+                    except OSError as error:
+                        cmds.logger.warning("scan %s error: %s", path, error)
+                scan_stat.links = []
+        finally:
+            if tuner is not None:
+                tuner.report()
+
+    @classmethod
+    def iterate(cls,  # pylint: disable=R0913,R0917
+                paths: Sequence[str],
+                exclude: Optional[Sequence[str]] = None,
+                linkdir: bool = True,
+                threads: int = THDNUM_DEFAULT,
+                handler: Optional[Callable[[object], bool]] = None,
+                qsize: int = QUEUE_SIZE_DEFAULT,
+                previous: Optional["scanner"] = None,
+                restat: bool = False,
+                revisit: Optional[Callable[[object, str], None]] = None,
+                where: Optional[predicate] = None
+                ) -> Generator[object, None, None]:
+        '''scan paths and yield objects as worker threads discover them
+
+        Directories are walked by `os.scandir` and typed `os.DirEntry` are
+        handed to workers, usually one stat per entry. Work is scheduled
+        by per-worker deques with work stealing, idle workers sleep until
+        new work is pushed or the walk is done. Objects are handed over
+        in batches through a queue bounded by `qsize` objects so memory
+        stays flat, breaking the loop (or closing the generator) stops
+        the workers.
+
+        Paths matching `exclude` (exact paths, glob or regular expression
+        patterns, see `matcher`) are pruned before they are queued, so
+        excluded directories are never listed.
+
+        Directories are listed once per (st_dev, st_ino) across all worker
+        threads, a directory reached again (e.g. through a symbolic link,
+        or a symbolic link loop) is yielded but not walked again. The
+        optional `revisit` is called with the object and the path of the
+        first visit. Symbolic link dirs are walked in a later phase, after
+        the real directories, so a directory is always walked by its real
+        path, and by the first link in path order if only linked.
+
+        With a `previous` scan result, directories whose inode and
+        `st_mtime_ns` are unchanged are not listed again, their entries
+        are taken from `previous` (and restat'ed only if `restat` is True).
+
+        A `where` predicate (find-style conditions, see `predicate`) is
+        checked with `os.DirEntry` data before entries are queued, only
+        matching objects are yielded (and passed to `handler`).
+
+        With `threads=THDNUM_AUTO` the number of worker threads is tuned
+        while walking (see `walk()`).
+        '''
+        for objs in cls.walk(paths=paths, exclude=exclude, linkdir=linkdir,
+                             threads=threads, handler=handler, qsize=qsize,
+                             previous=previous, restat=restat,
+                             revisit=revisit,
+                             batch=max(1, min(SCAN_BATCH_SIZE, qsize)),
+                             where=where):
+            yield from objs
+
+    @classmethod
+    def read_paths(cls, stream: IO, null: bool = False,
+                   size: int = SNAPSHOT_BUFFER
+                   ) -> Generator[str, None, None]:
+        '''split a text or binary stream (e.g. stdin) into paths
+
+        Paths are separated by newline, or by NUL if `null` is True (as
+        `xargs -0`, e.g. `git ls-files -z`), empty paths are skipped. The
+        stream is read in blocks of `size`.
+        '''
+        rest: Union[str, bytes, None] = None
+        while True:
+            data = stream.read(size)
+            if not data:
+                break
+            if isinstance(data, bytes):
+                sep: Union[str, bytes] = b"\0" if null else b"\n"
+            else:
+                sep = "\0" if null else "\n"
+            lines = (rest + data if rest else data).split(sep)
+            rest = lines.pop()
+            for line in lines:
+                if line:
+                    yield os.fsdecode(line)
+        if rest:
+            yield os.fsdecode(rest)
+
+    @classmethod
+    def stat_paths(cls,
+                   paths: Iterable[str],
+                   threads: int = THDNUM_DEFAULT,
+                   handler: Optional[Callable[[object], bool]] = None,
+                   batch: int = SCAN_BATCH_SIZE
+                   ) -> Generator[List[object], None, None]:
+        '''stat explicit paths in parallel, yield batches of objects
+
+        Paths are not walked (directories are stat'ed but never listed)
+        and not deduplicated. Missing paths and broken symbolic links are
+        logged and skipped. Paths are taken from the iterable (e.g. of
+        `read_paths()`) in batches of `batch`, with a bounded number of
+        batches in flight, results are yielded in completion order.
+        '''
+        assert isinstance(batch, int) and batch > 0, \
+            f"invalid batch size {batch}"
+        cmds = commands()
+        thds = min(max(THDNUM_MINIMUM, THDNUM_DEFAULT
+                       if threads == THDNUM_AUTO else threads),
+                   THDNUM_MAXIMUM)
+
+        def task_stat(chunk: List[str]) -> List[scanner.object]:
+            objs: List[scanner.object] = []
+            for path in chunk:
+                obj = scanner.object(path)
+                try:
+                    obj.stat  # pylint: disable=W0104  # take snapshot
+                except OSError as error:
+                    cmds.logger.debug("stat %s error: %s", path, error)
+                    continue
+                if handler is not None:
+                    ret = handler(obj)
+                    assert isinstance(ret, bool)
+                    if ret is not True:
+                        continue
+                objs.append(obj)
+            return objs
+
+        iterator = iter(paths)
+        with thread_executor(max_workers=thds,
+                             thread_name_prefix="xarg-stat") as executor:
+            pending: Set[Future] = set()
+            try:
+                while True:
+                    while len(pending) < thds * 4:
+                        chunk = list(islice(iterator, batch))
+                        if not chunk:
+                            break
+                        pending.add(executor.submit(task_stat, chunk))
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        objs = future.result()
+                        if objs:
+                            yield objs
+            finally:  # stop early, e.g. the consumer breaks the loop
+                for future in pending:
+                    future.cancel()
+
+    @classmethod
+    def load_paths(cls,
+                   paths: Iterable[str],
+                   threads: int = THDNUM_DEFAULT,
+                   handler: Optional[Callable[[object], bool]] = None,
+                   batch: int = SCAN_BATCH_SIZE) -> "scanner":
+        '''stat explicit paths into a scanner, see `stat_paths()`
+
+        e.g. `scanner.load_paths(scanner.read_paths(sys.stdin))`
+        '''
+        objects = scanner()
+        for objs in cls.stat_paths(paths, threads, handler, batch):
+            for obj in objs:
+                objects.add(obj)
+        return objects
+
+    @classmethod
+    def __batches(cls, generator: Generator[Any, None, None],
+                  size: int) -> Generator[List[Any], None, None]:
+        try:
+            while True:
+                items = list(islice(generator, size))
+                if not items:
+                    return
+                yield items
+        finally:
+            generator.close()
+
+    @classmethod
+    async def __agenerate(cls, generator: Generator[List[Any], None, None],
+                          executor: Optional[Executor] = None
+                          ) -> AsyncGenerator[List[Any], None]:
+        '''drive a blocking generator of batches in the executor
+
+        The event loop only waits for whole batches, the generator is
+        closed in the executor when the async generator is closed or
+        cancelled (after a running batch is done).
+        '''
+        loop = asyncio.get_running_loop()
+        lock = Lock()
+
+        def take() -> Optional[List[Any]]:
+            with lock:
+                return next(generator, None)
+
+        def close():
+            with lock:
+                generator.close()
+
+        try:
+            while True:
+                items = await loop.run_in_executor(executor, take)
+                if items is None:
+                    break
+                yield items
+        finally:
+            await loop.run_in_executor(executor, close)
+
+    @classmethod
+    async def aiter(cls,  # pylint: disable=R0913,R0917
+                    paths: Sequence[str],
+                    exclude: Optional[Sequence[str]] = None,
+                    linkdir: bool = True,
+                    threads: int = THDNUM_DEFAULT,
+                    handler: Optional[Callable[[object], bool]] = None,
+                    qsize: int = QUEUE_SIZE_DEFAULT,
+                    revisit: Optional[Callable[[object, str], None]] = None,
+                    batch: int = SCAN_BATCH_SIZE,
+                    executor: Optional[Executor] = None,
+                    where: Optional[predicate] = None
+                    ) -> AsyncGenerator[object, None]:
+        '''async version of `iterate()`
+
+        The walk and the stat calls run on the scan worker threads, the
+        event loop gets objects in batches of up to `batch` through the
+        `executor` (the default executor of the loop if None), so it is
+        never blocked by file system calls. Cancelling the task or closing
+        the async generator stops the walk.
+
+        usage:
+            async for obj in scanner.aiter(paths=["."]):
+                ...
+        '''
+        assert isinstance(batch, int) and batch > 0
+        walk = cls.walk(paths=paths, exclude=exclude, linkdir=linkdir,
+                        threads=threads, handler=handler, qsize=qsize,
+                        revisit=revisit, batch=min(batch, qsize),
+                        where=where)
+        batches = cls.__agenerate(walk, executor)
+        try:
+            async for objs in batches:
+                for obj in objs:
+                    yield obj
+        finally:
+            await batches.aclose()
+
+    @classmethod
+    async def ahash_objects(cls,  # pylint: disable=R0913,R0917
+                            objects: Iterable[object],
+                            algorithms: Sequence[str] = ("md5",),
+                            workers: int = THDNUM_DEFAULT,
+                            size: int = HASH_CHUNK_SIZE,
+                            cache: Optional[hashcache] = None,
+                            batch: int = SCAN_BATCH_SIZE,
+                            executor: Optional[Executor] = None
+                            ) -> AsyncGenerator[Tuple[object, Dict[str, str]], None]:  # noqa:E501
+        '''async version of `hash_objects()`, results are handed to the
+        event loop in batches of up to `batch`
+        '''
+        assert isinstance(batch, int) and batch > 0
+        results = cls.hash_objects(objects, algorithms, workers, size, cache)
+        batches = cls.__agenerate(cls.__batches(results, batch), executor)
+        try:
+            async for items in batches:
+                for item in items:
+                    yield item
+        finally:
+            await batches.aclose()
+
+    async def ahash_files(self, algorithms: Sequence[str] = ("md5",),
+                          workers: int = THDNUM_DEFAULT,
+                          size: int = HASH_CHUNK_SIZE,
+                          cache: Optional[hashcache] = None,
+                          executor: Optional[Executor] = None
+                          ) -> AsyncGenerator[Tuple[object, Dict[str, str]], None]:  # noqa:E501
+        '''async version of `hash_files()`
+        '''
+        results = self.ahash_objects(self.files, algorithms, workers, size,
+                                     cache, executor=executor)
+        try:
+            async for item in results:
+                yield item
+        finally:
+            await results.aclose()
+
+    @classmethod
+    def watch(cls,  # pylint: disable=R0913,R0917
+              paths: Sequence[str],
+              exclude: Optional[Sequence[str]] = None,
+              linkdir: bool = False,
+              threads: int = THDNUM_DEFAULT,
+              handler: Optional[Callable[[object], bool]] = None,
+              latency: float = 0.1):
+        '''scan paths and keep the result current with inotify (Linux)
+
+        Return a `watcher`, its `objects` are updated as its `events()` are
+        consumed.
+        '''
+        from .watcher import watcher  # pylint: disable=C0415,R0401
+        return watcher(paths=paths, exclude=exclude, linkdir=linkdir,
+                       threads=threads, handler=handler, latency=latency)
+
+    @classmethod
+    def is_modified(cls, old: object, new: object) -> bool:
+        '''compare captured metadata, access time is ignored
+        '''
+        if old.islink != new.islink:
+            return True
+        ost, nst = old.stat, new.stat
+        return (ost.st_mode, ost.st_ino, ost.st_dev, ost.st_uid, ost.st_gid,
+                ost.st_size, ost.st_mtime_ns) != \
+            (nst.st_mode, nst.st_ino, nst.st_dev, nst.st_uid, nst.st_gid,
+             nst.st_size, nst.st_mtime_ns)
+
+    @classmethod
+    def refresh(cls,  # pylint: disable=R0913,R0917
+                snapshot: Union[str, "scanner"],
+                paths: Optional[Sequence[str]] = None,
+                exclude: Optional[Sequence[str]] = None,
+                linkdir: bool = True,
+                threads: int = THDNUM_DEFAULT,
+                handler: Optional[Callable[[object], bool]] = None,
+                restat: bool = False) -> Tuple["scanner", "scanner.changes"]:
+        '''incremental rescan of a previous result (or saved snapshot)
+
+        Directories whose inode and `st_mtime_ns` are unchanged are not
+        listed again, only entries of changed directories are restat'ed.
+        Content modifications in unchanged directories are not detected
+        unless `restat` is True. The scanned paths of the snapshot are
+        used if `paths` is not specified.
+        '''
+        if isinstance(snapshot, str):
+            snapshot = cls.restore(snapshot)
+        assert isinstance(snapshot, scanner)
+        if paths is None:
+            paths = snapshot.roots
+
+        objects = scanner(roots=paths)
+        changes = scanner.changes()
+        for obj in cls.iterate(paths=paths, exclude=exclude, linkdir=linkdir,
+                               threads=threads, handler=handler,
+                               previous=snapshot, restat=restat):
+            objects.add(obj)
+            if obj.path not in snapshot:
+                changes.added.append(obj)
+                continue
+            old = snapshot[obj.path]
+            if old is not obj and cls.is_modified(old, obj):
+                changes.modified.append(obj)
+        changes.removed.extend(obj for obj in snapshot
+                               if obj.path not in objects)
+        return objects, changes
+
+    @classmethod
+    def __rows(cls, source: Union[str, "scanner"]
+               ) -> Generator[Tuple[str, Tuple[int, int, int, bool], Any], None, None]:  # noqa:E501
+        '''yield (path, (mode, size, mtime_ns, islink), object or record)
+        sorted by path
+        '''
+        if isinstance(source, scanner):
+            for obj in sorted(source, key=lambda obj: obj.path):
+                try:
+                    result = obj.stat
+                except OSError:
+                    continue
+                yield obj.path, (result.st_mode, result.st_size,
+                             result.st_mtime_ns, obj.islink), obj
+            return
+
+        fields = scanner.object.STAT_FIELDS
+        mode, size, mtime = (fields.index(field) for field in
+                             ("st_mode", "st_size", "st_mtime_ns"))
+        records = cls.__records(source)
+        header = next(records, {})
+        if not header.get("sorted", False):  # saved by an older version
+            records = iter(sorted(records, key=lambda r: r["path"]))
+        for record in records:
+            values = record["stat"]
+            yield record["path"], (values[mode], values[size], values[mtime],
+                                   "lstat" in record), record
+
+    @classmethod
+    def diff(cls,  # pylint: disable=R0912
+             old: Union[str, "scanner"], new: Union[str, "scanner"],
+             content: bool = False) -> "scanner.changes":
+        '''compare two scan results (or saved snapshots)
+
+        Entries are merged linearly in path order, an entry is modified if
+        its type, mode, size or mtime is changed. Saved snapshots are read
+        as streams, only changed entries are rebuilt as objects, there is
+        no file system access.
+
+        If `content` is True, entries with unchanged metadata but different
+        recorded digests (of a common algorithm) are content changes.
+        '''
+        changes = scanner.changes()
+
+        def build(row) -> scanner.object:
+            item = row[2]
+            return item if isinstance(item, scanner.object) else \
+                scanner.object.from_record(item)
+
+        def digests(row) -> Dict[str, str]:
+            item = row[2]
+            return item.digests if isinstance(item, scanner.object) else \
+                item.get("digests", {})
+
+        olds = cls.__rows(old)
+        news = cls.__rows(new)
+        orow = next(olds, None)
+        nrow = next(news, None)
+        while orow is not None or nrow is not None:
+            if nrow is None or (orow is not None and orow[0] < nrow[0]):
+                changes.removed.append(build(orow))
+                orow = next(olds, None)
+                continue
+            if orow is None or nrow[0] < orow[0]:
+                changes.added.append(build(nrow))
+                nrow = next(news, None)
+                continue
+            if orow[1] != nrow[1]:
+                changes.modified.append(build(nrow))
+            elif content:
+                odigests, ndigests = digests(orow), digests(nrow)
+                if any(odigests[name] != ndigests[name]
+                       for name in odigests.keys() & ndigests.keys()):
+                    changes.content.append(build(nrow))
+            orow = next(olds, None)
+            nrow = next(news, None)
+        return changes
+
+    @classmethod
+    def __write(cls, whdl: IO[str], roots: Sequence[str],
+                objects: Iterable[object], ordered: bool) -> int:
+        '''write header and records in blocks of about SNAPSHOT_BUFFER'''
+        cmds = commands()
+        encode = json.JSONEncoder(separators=(",", ":"),
+                                  check_circular=False).encode
+        whdl.write(json.dumps({"format": SNAPSHOT_FORMAT,
+                               "version": SNAPSHOT_VERSION,
+                               "roots": list(roots),
+                               "sorted": ordered}) + "\n")
+        lines: List[str] = []
+        length: int = 0
+        count: int = 0
+        for obj in objects:
+            try:
+                line = encode(obj.record)
+            except OSError as error:
+                cmds.logger.warning("save %s error: %s", obj.path, error)
+                continue
+            lines.append(line)
+            length += len(line)
+            count += 1
+            if length >= SNAPSHOT_BUFFER:
+                lines.append("")
+                whdl.write("\n".join(lines))
+                lines.clear()
+                length = 0
+        if lines:
+            lines.append("")
+            whdl.write("\n".join(lines))
+        whdl.flush()
+        return count
+
+    def save(self, path: str):
+        '''save snapshot as JSON lines sorted by path, no file system access
+
+        The snapshot is written to a temporary file and then renamed.
+        '''
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8",
+                  buffering=SNAPSHOT_BUFFER) as whdl:
+            self.__write(whdl, self.roots, (self.__objdict[key] for key
+                                            in sorted(self.__objdict)), True)
+        os.replace(temp, path)
+
+    @classmethod
+    def export(cls, objects: Iterable[object], output: Union[str, IO[str]],
+               roots: Sequence[str] = ()) -> int:
+        '''stream captured metadata (and computed digests) as JSON lines
+
+        Objects are written as they come, e.g. while the walk progresses:
+            scanner.export(scanner.iterate(paths), sys.stdout, paths)
+
+        Records are in the snapshot format (in walk order, see `restore()`)
+        and written in blocks of about SNAPSHOT_BUFFER. A file `output`
+        is written to a temporary file and then renamed. Return the number
+        of records.
+        '''
+        if not isinstance(output, str):
+            return cls.__write(output, roots, objects, False)
+        temp = f"{output}.tmp"
+        with open(temp, "w", encoding="utf-8",
+                  buffering=SNAPSHOT_BUFFER) as whdl:
+            count = cls.__write(whdl, roots, objects, False)
+        os.replace(temp, output)
+        return count
+
+    @classmethod
+    def __records(cls, source: Union[str, IO[str]]
+                  ) -> Generator[Dict[str, Any], None, None]:
+        '''yield header and then records of a snapshot'''
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8",
+                      buffering=SNAPSHOT_BUFFER) as rhdl:
+                yield from cls.__records(rhdl)
+            return
+        name = getattr(source, "name", "stream")
+        header = json.loads(source.readline() or "{}")
+        assert header.get("format") == SNAPSHOT_FORMAT, \
+            f"'{name}' is not a scanner snapshot"
+        assert header.get("version") == SNAPSHOT_VERSION, \
+            f"unsupported snapshot version {header.get('version')}"
+        yield header
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+    @classmethod
+    def restore(cls, source: Union[str, IO[str]]) -> "scanner":
+        '''load snapshot (or export) from a file or text stream without
+        file system access
+        '''
+        records = cls.__records(source)
+        objects = scanner(roots=next(records)["roots"])
+        for record in records:
+            objects.add(scanner.object.from_record(record))
+        return objects
+
+    @classmethod
+    def rpath(cls, path: str) -> str:
+        assert isinstance(path, str)
+        return os.path.relpath(path)
+
+    # filter files and directorys
+    @classmethod
+    def path_filter(cls, exclude: Sequence[str]) -> matcher:
+        return matcher(exclude)
+
+    @classmethod
+    def dump_shard(cls,  # pylint: disable=R0913,R0917
+                   path: str,
+                   exclude: Optional[Sequence[str]] = None,
+                   linkdir: bool = True,
+                   threads: int = THDNUM_DEFAULT,
+                   handler: Optional[Callable[[object], bool]] = None,
+                   batch: int = SHARD_BATCH_SIZE) -> List[bytes]:
+        '''scan a subtree into compact serialized batches, see `sharded()`
+
+        Each batch is a `marshal` dump of (path, stat, lstat) tuples with
+        packed stat values, lstat is None if it is not a symbolic link.
+        '''
+        batches: List[bytes] = []
+        records: List[Tuple[str, List[int], Optional[List[int]]]] = []
+        for obj in cls.iterate(paths=[path], exclude=exclude, linkdir=linkdir,
+                               threads=threads, handler=handler):
+            try:
+                records.append((obj.path, obj.pack_stat(obj.stat),
+                                obj.pack_stat(obj.lstat)
+                                if obj.islink else None))
+            except OSError:
+                continue
+            if len(records) >= batch:
+                batches.append(marshal.dumps(records))
+                records = []
+        if records:
+            batches.append(marshal.dumps(records))
+        return batches
+
+    @classmethod
+    def load_shard(cls, data: bytes) -> List[object]:
+        '''rebuild objects of a batch from `dump_shard()`'''
+        objs: List[scanner.object] = []
+        for path, result, lresult in marshal.loads(data):
+            record: Dict[str, Any] = {"path": path, "stat": result}
+            if lresult is not None:
+                record["lstat"] = lresult
+            objs.append(scanner.object.from_record(record))
+        return objs
+
+    def weights(self, depth: int = SHARD_DEPTH) -> Dict[str, int]:
+        '''observed entry counts of directory subtrees (including itself)
+
+        Only directories up to `depth` levels below the roots are counted,
+        the result of a previous scan balances `sharded()`.
+        '''
+        counts: Dict[str, int] = {}
+        roots = [root.rstrip(os.sep) or os.sep for root in
+                 (self.rpath(path) for path in self.roots)]
+        for obj in self:
+            path = obj.path
+            for root in roots:
+                if path == root:
+                    levels = []
+                elif root == os.curdir and not os.path.isabs(path):
+                    levels = path.split(os.sep)  # e.g. "a" of root "."
+                elif path.startswith(root + os.sep):
+                    levels = path[len(root):].strip(os.sep).split(os.sep)
+                else:
+                    continue
+                for level in range(min(len(levels), depth) + 1):
+                    key = os.path.normpath(os.path.join(root,
+                                                        *levels[:level]))
+                    counts[key] = counts.get(key, 0) + 1
+                break
+        return counts
+
+    @classmethod
+    def sharded(cls,  # pylint: disable=R0912,R0913,R0914,R0917
+                paths: Sequence[str],
+                exclude: Optional[Sequence[str]] = None,
+                linkdir: bool = True,
+                threads: int = THDNUM_MINIMUM,
+                handler: Optional[Callable[[object], bool]] = None,
+                processes: int = PROCESSES_DEFAULT,
+                previous: Optional["scanner"] = None) -> "scanner":
+        '''scan paths with a pool of worker processes
+
+        Subdirectories of the roots are sharded across `processes` worker
+        processes, each shard is walked by `threads` worker threads (see
+        `dump_shard()`), the parent merges the batches into one scanner.
+
+        With a `previous` scan result, shards are balanced by observed
+        entry counts (see `weights()`): heavy shards are split into their
+        subdirectories and the heaviest shards are scheduled first.
+
+        The `handler` runs in the worker processes, it must be picklable
+        (e.g. a module-level function). Revisited directories are detected
+        within a shard only.
+        '''
+        if exclude is None:
+            exclude = []
+
+        assert isinstance(paths, Sequence)
+        assert isinstance(exclude, Sequence)
+        assert isinstance(processes, int) and processes > 0
+
+        cmds = commands()
+        objects = scanner(roots=paths)
+        pathfilter = cls.path_filter(exclude)
+        weights = previous.weights() if previous is not None else {}
+        shards: List[Tuple[int, int, str]] = []  # heap of (-weight, depth)
+
+        def accept(obj: scanner.object) -> bool:
+            if handler is None:
+                return True
+            ret = handler(obj)
+            assert isinstance(ret, bool)
+            return ret
+
+        def split(path: str, depth: int):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # normalized as objects (e.g. "./a" of root ".")
+                    sub = os.path.normpath(entry.path)
+                    if sub in pathfilter:
+                        continue
+                    obj = scanner.object(sub, entry)
+                    try:
+                        isdir = stat.S_ISDIR(obj.stat.st_mode)
+                    except FileNotFoundError:  # broken symbolic link
+                        continue
+                    if isdir and (linkdir or not entry.is_symlink()):
+                        heapq.heappush(shards, (-weights.get(sub, 1),
+                                                depth, sub))
+                    elif accept(obj):
+                        objects.add(obj)
+
+        for path in paths:
+            path = cls.rpath(path)
+            if path in pathfilter or not os.path.exists(path):
+                continue
+            obj = scanner.object(path)
+            if accept(obj):
+                objects.add(obj)
+            if obj.isdir and (linkdir or not obj.islink):
+                split(path, 1)
+
+        # split heavy shards, a shard should not outweigh a worker share
+        share = sum(-shard[0] for shard in shards) // (processes * 4)
+        while shards and -shards[0][0] > max(share, 1) and \
+                shards[0][1] < SHARD_DEPTH:
+            _, depth, path = heapq.heappop(shards)
+            obj = scanner.object(path)
+            if accept(obj):
+                objects.add(obj)
+            split(path, depth + 1)
+
+        if not shards:
+            return objects
+
+        order = [heapq.heappop(shards)[2] for _ in range(len(shards))]
+        cmds.logger.debug("scan %d shards with %d processes",
+                          len(order), processes)
+        with ProcessPoolExecutor(max_workers=min(processes, len(order))) \
+                as executor:
+            futures = [executor.submit(cls.dump_shard, path, exclude,
+                                       linkdir, threads, handler)
+                       for path in order]
+            for future in as_completed(futures):
+                for data in future.result():
+                    for obj in cls.load_shard(data):
+                        objects.add(obj)
+        return objects
+
+    @classmethod
+    def load(cls,  # pylint: disable=R0913,R0914,R0915,R0917
+             paths: Sequence[str],
+             exclude: Optional[Sequence[str]] = None,
+             linkdir: bool = True,
+             threads: int = THDNUM_DEFAULT,
+             handler: Optional[Callable[[object], bool]] = None,
+             engine: str = ENGINE_SCANDIR,
+             revisit: Optional[Callable[[object, str], None]] = None,
+             processes: int = 0,
+             where: Optional[predicate] = None,
+             previous: Optional["scanner"] = None):
+        '''scan paths with worker threads
+
+        The `scandir` engine (default) collects the objects of `iterate()`.
+        The `listdir` engine is the legacy implementation, it does not
+        detect revisited directories.
+
+        If `processes` is more than 1, subtrees are scanned by a pool of
+        worker processes, see `sharded()`. The `threads` are split across
+        the processes (at least `THDNUM_MINIMUM` each, `THDNUM_AUTO` adapts
+        in each process), `revisit` is not supported. With a `previous`
+        scan result, the shards are balanced by its entry counts.
+
+        The `where` predicate is evaluated by the `scandir` engine only,
+        see `iterate()`.
+        '''
+        if exclude is None:
+            exclude = []
+
+        assert isinstance(paths, Sequence)
+        assert isinstance(exclude, Sequence)
+        assert isinstance(linkdir, bool)
+        assert isinstance(threads, int)
+        assert engine in ENGINES, f"unknown scan engine '{engine}'"
+        assert where is None or (engine == ENGINE_SCANDIR and
+                                 processes <= 1), \
+            "predicate is not supported by this engine"
+        assert revisit is None or engine != ENGINE_SCANDIR or \
+            processes <= 1, "revisit is not supported by sharded scan"
+
+        if engine == ENGINE_SCANDIR and processes > 1:
+            # each process walks with its share of the threads
+            thds = threads if threads == THDNUM_AUTO else \
+                max(THDNUM_MINIMUM, threads // processes)
+            return cls.sharded(paths=paths, exclude=exclude, linkdir=linkdir,
+                               threads=thds, handler=handler,
+                               processes=processes, previous=previous)
+
+        if engine == ENGINE_SCANDIR:
+            objects = scanner(roots=paths)
+            # worker local batches are merged once at the end
+            for objs in cls.walk(paths=paths, exclude=exclude,
+                                 linkdir=linkdir, threads=threads,
+                                 handler=handler, revisit=revisit, batch=0,
+                                 where=where):
+                for obj in objs:
+                    objects.add(obj)
+            return objects
+
+        cmds = commands()
+        # the legacy engine does not adapt, THDNUM_AUTO is the default
+        thds = min(max(THDNUM_MINIMUM, THDNUM_DEFAULT
+                       if threads == THDNUM_AUTO else threads),
+                   THDNUM_MAXIMUM)
+        rpath = cls.rpath
 
         class task_stat:  # pylint: disable=too-few-public-methods
 
             def __init__(self):
                 self.exit = False
                 self.handler = handler
-                self.scanner = scanner()
-                self.filter: Set[str] = path_filter()
+                self.scanner = scanner(roots=paths)
+                self.filter: matcher = cls.path_filter(exclude)
                 self.q_path: "Queue[str]" = Queue()
                 self.q_task: "Queue[scanner.object]" = Queue(maxsize=thds * 2)
 
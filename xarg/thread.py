@@ -1,14 +1,20 @@
 # coding:utf-8
 
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
+from threading import Condition
 from threading import Lock
 from threading import Thread
 from threading import current_thread
+from threading import local
 from time import time
 from typing import Any
 from typing import Callable
+from typing import Deque
 from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
 from typing import Set
 from typing import Tuple
@@ -258,3 +264,318 @@ class task_pool(dict[int, task_job]):
     def startup(self) -> None:
         '''start task threads'''
         self.barrier()
+
+
+class work_stealing():  # pylint: disable=too-many-instance-attributes
+    '''Work Stealing Scheduler
+
+    Each worker thread owns a deque, work pushed by a worker goes to the
+    tail of its own deque and is popped from the tail (depth-first), idle
+    workers steal from the head of the other deques. Idle workers wait on
+    a condition instead of polling, the scheduler stops when all pushed
+    work is done (or any work raises an exception).
+
+    Only the first `active` workers take work, the others are parked
+    until `resize()` lets them in again (their deques are still stolen).
+    '''
+
+    def __init__(self, target: Callable[[Any], None], workers: int = 1,
+                 name: str = "work_thread",
+                 initializer: Optional[Callable[[], None]] = None,
+                 finalizer: Optional[Callable[[], None]] = None):
+        wsize: int = max(workers, 1)
+        self.__target: Callable[[Any], None] = target
+        self.__name: str = name
+        self.__initializer: Optional[Callable[[], None]] = initializer
+        self.__finalizer: Optional[Callable[[], None]] = finalizer
+        self.__deques: List[Deque[Any]] = [deque() for _ in range(wsize)]
+        self.__threads: List[Thread] = []
+        self.__cond: Condition = Condition(Lock())
+        self.__local = local()
+        self.__error: Optional[BaseException] = None
+        self.__stopped: bool = False
+        self.__pending: int = 0
+        self.__idle: int = 0
+        self.__parked: int = 0
+        self.__active: int = wsize
+        self.__next: int = 0
+        self.__steals: int = 0
+
+    def __enter__(self):
+        self.startup()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.stop()
+        self.join()
+
+    @property
+    def workers(self) -> int:
+        '''number of worker threads'''
+        return len(self.__deques)
+
+    @property
+    def active(self) -> int:
+        '''number of workers taking work'''
+        return self.__active
+
+    @property
+    def pending(self) -> int:
+        '''pushed but not done work'''
+        return self.__pending
+
+    @property
+    def steals(self) -> int:
+        '''stolen work counter'''
+        return self.__steals
+
+    @property
+    def stopped(self) -> bool:
+        '''all work done or stopped'''
+        return self.__stopped
+
+    @property
+    def worker(self) -> Optional[int]:
+        '''worker index of current thread'''
+        return getattr(self.__local, "index", None)
+
+    def startup(self) -> None:
+        '''start worker threads'''
+        assert not self.__threads, "work stealing is already started"
+        for i in range(self.workers):
+            thread = Thread(name=f"{self.__name}{i}", target=self.__task,
+                            args=(i,))
+            self.__threads.append(thread)
+            thread.start()
+
+    def push(self, item: Any) -> None:
+        '''push work, see `extend()`'''
+        self.extend((item,))
+
+    def extend(self, items: Iterable[Any]) -> None:
+        '''push work to the deque of current worker
+
+        Work pushed by other threads is distributed round-robin.
+        '''
+        items = list(items)
+        if not items:
+            return
+        with self.__cond:
+            if self.__stopped:
+                return
+            self.__pending += len(items)  # before the work is visible
+            index = self.worker
+            if index is None:
+                index = self.__next % self.__active
+                self.__next += 1
+        self.__deques[index].extend(items)
+        if self.__idle > 0:
+            with self.__cond:  # parked workers may take the notification
+                self.__cond.notify(len(items) + self.__parked)
+
+    def resize(self, active: int) -> int:
+        '''set number of workers taking work (1 to `workers`), a worker
+        above it is parked after its current work, return the new number
+        '''
+        with self.__cond:
+            self.__active = min(max(active, 1), self.workers)
+            self.__cond.notify_all()
+            return self.__active
+
+    def stop(self) -> None:
+        '''stop workers, pending work is dropped'''
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify_all()
+
+    def join(self) -> None:
+        '''wait for all work done and workers exit
+
+        The first exception raised by work is raised again.
+        '''
+        with self.__cond:
+            if self.__pending == 0:
+                self.__stopped = True
+                self.__cond.notify_all()
+            while not self.__stopped:
+                self.__cond.wait()
+        while self.__threads:
+            self.__threads.pop().join()
+        for work in self.__deques:
+            work.clear()
+        if self.__error is not None:
+            raise self.__error
+
+    def __park(self, index: int) -> bool:
+        '''wait while the worker is above active, False if stopped'''
+        with self.__cond:
+            self.__parked += 1
+            try:
+                while not self.__stopped and index >= self.__active:
+                    self.__cond.wait()
+                return not self.__stopped
+            finally:
+                self.__parked -= 1
+
+    def __get(self, index: int) -> Tuple[bool, Any]:
+        own = self.__deques[index]
+        while True:
+            if index >= self.__active and not self.__park(index):
+                return False, None
+            try:
+                return True, own.pop()
+            except IndexError:
+                pass
+            for i in range(1, self.workers):
+                try:
+                    item = self.__deques[(index + i) % self.workers].popleft()
+                    self.__steals += 1
+                    return True, item
+                except IndexError:
+                    continue
+            with self.__cond:
+                self.__idle += 1
+                try:
+                    while not self.__stopped and not any(self.__deques) \
+                            and index < self.__active:
+                        self.__cond.wait()
+                    if self.__stopped:
+                        return False, None
+                finally:
+                    self.__idle -= 1
+
+    def __done(self) -> None:
+        with self.__cond:
+            self.__pending -= 1
+            if self.__pending == 0:
+                self.__stopped = True
+                self.__cond.notify_all()
+
+    def __task(self, index: int) -> None:
+        self.__local.index = index
+        try:
+            if self.__initializer is not None:
+                self.__initializer()
+            while not self.__stopped:
+                ok, item = self.__get(index)
+                if not ok:
+                    break
+                try:
+                    self.__target(item)
+                except BaseException as error:  # pylint: disable=W0718
+                    with self.__cond:
+                        if self.__error is None:
+                            self.__error = error
+                        self.__stopped = True
+                        self.__cond.notify_all()
+                finally:
+                    self.__done()
+        finally:
+            if self.__finalizer is not None:
+                self.__finalizer()
+
+
+class concurrency():  # pylint: disable=too-many-instance-attributes
+    '''Adaptive Worker Count
+
+    Workers call `record()` with the latency of each operation, the
+    driver calls `adjust()` with the queue depth and applies the returned
+    count (e.g. `work_stealing.resize()`). Every `interval` seconds the
+    throughput of the last interval is compared with the one before: the
+    count keeps moving the same way with a doubling step while throughput
+    improves by more than `tolerance`, turns back with a halved step when
+    it drops, and holds otherwise. It never grows beyond the queued work.
+
+    Fast local disks settle on few workers, high latency file systems
+    (e.g. NFS) keep growing towards `maximum`. Changes are logged at
+    debug level, `report()` logs the best count.
+    '''
+
+    def __init__(self,  # pylint: disable=R0913,R0917
+                 initial: int, minimum: int = 1, maximum: int = 64,
+                 interval: float = 0.25, tolerance: float = 0.05,
+                 name: str = "workers"):
+        assert 1 <= minimum <= maximum, \
+            f"invalid worker range {minimum} to {maximum}"
+        assert interval > 0, f"invalid interval {interval}"
+        self.__cmds: commands = commands()
+        self.__name: str = name
+        self.__minimum: int = minimum
+        self.__maximum: int = maximum
+        self.__interval: float = interval
+        self.__tolerance: float = tolerance
+        self.__active: int = min(max(initial, minimum), maximum)
+        self.__step: int = 1
+        self.__direction: int = 1
+        self.__rate: float = 0.0
+        self.__best: Tuple[int, float] = (self.__active, 0.0)
+        self.__start: float = time()
+        # approximate counters, updated by workers without lock
+        self.__ops: int = 0
+        self.__busy: float = 0.0
+        self.__total: int = 0
+
+    @property
+    def active(self) -> int:
+        '''current worker count'''
+        return self.__active
+
+    @property
+    def interval(self) -> float:
+        '''seconds between adjustments'''
+        return self.__interval
+
+    @property
+    def rate(self) -> float:
+        '''operations per second of the last interval'''
+        return self.__rate
+
+    @property
+    def best(self) -> Tuple[int, float]:
+        '''(worker count, operations per second) of the best interval'''
+        return self.__best
+
+    def record(self, latency: float) -> None:
+        '''count an operation which took `latency` seconds'''
+        self.__ops += 1
+        self.__busy += latency
+
+    def adjust(self, queued: int) -> int:
+        '''return the worker count for the next interval'''
+        elapsed = time() - self.__start
+        if elapsed < self.__interval:
+            return self.__active
+        ops, busy = self.__ops, self.__busy
+        self.__ops, self.__busy = 0, 0.0
+        self.__start += elapsed
+        self.__total += ops
+        rate = ops / elapsed
+        if rate > self.__best[1]:
+            self.__best = (self.__active, rate)
+        if rate > self.__rate * (1 + self.__tolerance):
+            self.__step = min(self.__step * 2, self.__maximum)
+        elif rate < self.__rate * (1 - self.__tolerance):
+            self.__direction = -self.__direction
+            self.__step = max(self.__step // 2, 1)
+        else:
+            self.__step = 0
+        self.__rate = rate
+        active = self.__active + self.__direction * self.__step
+        active = min(max(min(active, queued), self.__minimum),
+                     self.__maximum)
+        if active != self.__active:
+            self.__cmds.logger.debug(
+                "%s %d -> %d: %.0f ops/sec, %.3f ms/op, %d queued",
+                self.__name, self.__active, active, rate,
+                busy / ops * 1000 if ops else 0.0, queued)
+            self.__active = active
+        self.__step = max(self.__step, 1)
+        return self.__active
+
+    def report(self) -> None:
+        '''log the chosen (best) and the last worker count'''
+        self.__cmds.logger.info(
+            "%s auto: %d at %.0f ops/sec (last %d, %d ops)", self.__name,
+            self.__best[0], self.__best[1], self.__active,
+            self.__total + self.__ops)
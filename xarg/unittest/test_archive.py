@@ -0,0 +1,108 @@
+# coding:utf-8
+
+from hashlib import md5
+from hashlib import sha256
+import io
+import os
+import tarfile
+from tempfile import TemporaryDirectory
+import unittest
+import zipfile
+
+from xarg import archive
+from xarg import scanner
+
+
+class test_archive(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(self.tempdir.name)
+        self.datas = {"pkg/a.txt": b"a" * 1000, "pkg/sub/b.bin": b"b" * 10}
+        self.tar = os.path.join(self.root, "pkg.tar.gz")
+        with tarfile.open(self.tar, "w:gz") as thdl:
+            info = tarfile.TarInfo("./pkg")
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            thdl.addfile(info)
+            for name, data in self.datas.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = 1000000000
+                thdl.addfile(info, io.BytesIO(data))
+            info = tarfile.TarInfo("pkg/hard")
+            info.type = tarfile.LNKTYPE
+            info.linkname = "pkg/a.txt"
+            thdl.addfile(info)
+            info = tarfile.TarInfo("pkg/link")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "a.txt"
+            thdl.addfile(info)
+        self.zip = os.path.join(self.root, "pkg.zip")
+        with zipfile.ZipFile(self.zip, "w") as zhdl:
+            zhdl.writestr("pkg/", b"")
+            for name, data in self.datas.items():
+                zhdl.writestr(name, data)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_tar(self):
+        arch = archive.load(self.tar, algorithms=("md5", "sha256"))
+        self.assertEqual(arch.kind, "tar")
+        self.assertEqual(len(arch), 5)
+        self.assertEqual([obj.name for obj in arch.dirs], ["pkg"])
+        self.assertEqual(len(arch.files), 3)
+        self.assertEqual(len(arch.links), 1)
+        obj = arch[os.path.join("pkg", "a.txt")]
+        self.assertEqual(obj.path, os.path.join(self.tar, "pkg", "a.txt"))
+        self.assertEqual(obj.size, 1000)
+        self.assertEqual(obj.mtime, 1000000000)
+        self.assertTrue(obj.isfile)
+        for name, data in self.datas.items():
+            obj = arch[os.path.join(*name.split("/"))]
+            self.assertEqual(obj.digests, {"md5": md5(data).hexdigest(),
+                                           "sha256": sha256(data).hexdigest()})
+        hard = arch[os.path.join("pkg", "hard")]
+        self.assertEqual(hard.md5, md5(self.datas["pkg/a.txt"]).hexdigest())
+        self.assertEqual(arch[os.path.join("pkg", "link")].linkname, "a.txt")
+
+    def test_zip(self):
+        arch = archive.load(self.zip)
+        self.assertEqual(arch.kind, "zip")
+        self.assertEqual(len(arch), 3)
+        self.assertEqual(len(arch.dirs), 1)
+        obj = arch[os.path.join("pkg", "sub", "b.bin")]
+        self.assertEqual(obj.size, 10)
+        self.assertEqual(obj.digests, {})
+        # streamed out of the archive on demand
+        self.assertEqual(obj.sha1, obj.digest("sha1")["sha1"])
+        self.assertEqual(obj.md5, md5(self.datas["pkg/sub/b.bin"]).hexdigest())
+
+    def test_scan(self):
+        broken = os.path.join(self.root, "broken.zip")
+        with open(broken, "wb") as whdl:
+            whdl.write(b"broken")
+        objects = scanner.load(paths=[self.root])
+        paths = sorted(obj.path for obj in objects.files
+                       if archive.is_archive(obj.path))
+        self.assertEqual(paths, sorted([broken, self.tar, self.zip]))
+        archives = {arch.path: arch for arch in
+                    archive.scan(paths, algorithms=("md5",), workers=2)}
+        self.assertEqual(set(archives), {self.tar, self.zip})
+        digests = {obj.name: obj.md5 for obj in archives[self.zip].files}
+        for obj in archives[self.tar].files:
+            if obj.name in digests:
+                self.assertEqual(obj.md5, digests[obj.name])
+
+
+if __name__ == "__main__":
+    unittest.main()
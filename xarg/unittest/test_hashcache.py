@@ -0,0 +1,91 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import hashcache
+from xarg import scanner
+
+
+class test_hashcache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "cache", "test.sqlite3")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_get_and_put(self):
+        stat = os.stat(__file__)
+        with hashcache(self.path, batch=2) as cache:
+            self.assertIsNone(cache.get(stat, "md5"))
+            cache.put(stat, "md5", "unittest")
+            self.assertEqual(cache.get(stat, "md5"), "unittest")
+            self.assertIsNone(cache.get(stat, "sha1"))
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(cache.misses, 2)
+        with hashcache(self.path) as cache:
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.get(stat, "md5"), "unittest")
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+            self.assertIsNone(cache.get(stat, "md5"))
+
+    def test_evict(self):
+        stat = os.stat(__file__)
+        with hashcache(self.path, max_entries=10, batch=1) as cache:
+            for i in range(20):
+                cache.put(stat, f"test{i}", str(i))
+            self.assertLessEqual(len(cache), 10)
+            self.assertGreaterEqual(cache.evictions, 10)
+            self.assertEqual(cache.get(stat, "test19"), "19")
+            self.assertIsNone(cache.get(stat, "test0"))
+
+    def test_scanner_hash_files(self):
+        root = os.path.join(self.tempdir.name, "data")
+        os.mkdir(root)
+        for i in range(5):
+            with open(os.path.join(root, f"file{i}"), "w") as whdl:
+                whdl.write(str(i))
+        with hashcache(self.path) as cache:
+            first = {obj.path: digests for obj, digests in
+                     scanner.load(paths=[root]).hash_files(cache=cache)}
+            self.assertEqual(cache.misses, 5)
+            self.assertEqual(cache.hits, 0)
+            second = {obj.path: digests for obj, digests in
+                      scanner.load(paths=[root]).hash_files(cache=cache)}
+            self.assertEqual(cache.hits, 5)
+            self.assertEqual(first, second)
+            path = os.path.relpath(os.path.join(root, "file0"))
+            object = scanner.object(path)
+            self.assertEqual(object.digest("md5", cache=cache),
+                             first[object.path])
+            self.assertEqual(cache.hits, 6)
+
+    def test_scanner_stale_stat(self):
+        path = os.path.join(self.tempdir.name, "stale")
+        with open(path, "w") as whdl:
+            whdl.write("old")
+        object = scanner.object(path)
+        self.assertEqual(object.size, 3)  # snapshot the stat
+        with open(path, "w") as whdl:
+            whdl.write("newer")
+        with hashcache(self.path) as cache:
+            digest = object.digest("md5", cache=cache)["md5"]
+            # stored under the stat of the content that was hashed
+            self.assertIsNone(cache.get(object.stat, "md5"))
+            self.assertEqual(cache.get(os.stat(path), "md5"), digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# coding:utf-8
+
+import hashlib
+import io
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import hasher
+from xarg import scanner
+
+
+class test_hasher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def check(self, path: str):
+        with open(path, "rb") as rhdl:
+            data = rhdl.read()
+        for reader in (hasher(), hasher(chunk=4096), hasher(mmap_size=1),
+                       hasher(chunk=65536, overlap=False, sparse=False)):
+            md5, sha256 = hashlib.md5(), hashlib.sha256()
+            self.assertEqual(reader.update(path, md5, sha256), len(data))
+            self.assertEqual(md5.hexdigest(), hashlib.md5(data).hexdigest())
+            self.assertEqual(sha256.hexdigest(),
+                             hashlib.sha256(data).hexdigest())
+
+    def test_sizes(self):
+        for size in (0, 1, 4095, 70000, 9 * 1024**2 + 7):
+            path = os.path.join(self.tempdir.name, f"file{size}")
+            with open(path, "wb") as whdl:
+                whdl.write(os.urandom(size))
+            self.check(path)
+
+    def test_sparse(self):
+        path = os.path.join(self.tempdir.name, "sparse")
+        with open(path, "wb") as whdl:
+            whdl.truncate(16 * 1024**2)
+            whdl.seek(1024**2)
+            whdl.write(b"sparse" * 10000)
+            whdl.seek(8 * 1024**2)
+            whdl.write(b"x")
+        with open(path, "rb") as rhdl:
+            segments = hasher.segments(rhdl.fileno(), 16 * 1024**2)
+        self.assertEqual(sum(length for _, length, _ in segments),
+                         16 * 1024**2)
+        self.check(path)
+
+    def test_auto_chunk(self):
+        self.assertEqual(hasher.auto_chunk(0), 64 * 1024)
+        self.assertEqual(hasher.auto_chunk(32 * 1024**2), 2 * 1024**2)
+        self.assertEqual(hasher.auto_chunk(1024**4), 8 * 1024**2)
+
+    def test_feed(self):
+        data = os.urandom(10000)
+        md5, sha256 = hashlib.md5(), hashlib.sha256()
+        self.assertEqual(hasher.feed(io.BytesIO(data), [md5, sha256],
+                                     bytearray(4096)), len(data))
+        self.assertEqual(md5.hexdigest(), hashlib.md5(data).hexdigest())
+        self.assertEqual(sha256.hexdigest(), hashlib.sha256(data).hexdigest())
+
+    def test_missing(self):
+        self.assertRaises(OSError, hasher().update,
+                          os.path.join(self.tempdir.name, "missing"),
+                          hashlib.md5())
+
+    def test_scanner_digest(self):
+        path = os.path.join(self.tempdir.name, "file")
+        with open(path, "wb") as whdl:
+            whdl.write(os.urandom(1024**2))
+        obj = scanner.object(path)
+        self.assertEqual(obj.digest("md5", reader=hasher(chunk=4096)),
+                         scanner.object(path).digest("md5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import index
+from xarg import scanner
+
+
+class test_index(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(self.tempdir.name)
+        for name in ("a", "a-1", os.path.join("a", "b")):
+            os.mkdir(os.path.join(self.root, name))
+        for i, name in enumerate(("a/1.txt", "a/b/2.TXT", "a/b/3.log",
+                                  "a-1/4.txt", "5.gz")):
+            path = os.path.join(self.root, name)
+            with open(path, "w") as whdl:
+                whdl.write("x" * i * 10)
+            os.utime(path, (i * 1000, i * 1000))
+        os.symlink("5.gz", os.path.join(self.root, "link"))
+        self.objects = scanner.load(paths=[self.root])
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def names(self, objs):
+        return [os.path.relpath(obj.path, self.root) for obj in objs]
+
+    def test_query(self):
+        query = self.objects.query
+        self.assertEqual(self.names(query(ext="txt")),
+                         ["a-1/4.txt", "a/1.txt", "a/b/2.TXT"])
+        self.assertEqual(self.names(query(ext=(".log", "gz"))),
+                         ["5.gz", "a/b/3.log"])
+        self.assertEqual(self.names(query(min_size=10, max_size=30,
+                                          kind="file")),
+                         ["a-1/4.txt", "a/b/2.TXT", "a/b/3.log"])
+        self.assertEqual(self.names(query(under=os.path.join(self.root, "a"),
+                                          kind="file")),
+                         ["a/1.txt", "a/b/2.TXT", "a/b/3.log"])
+        self.assertEqual(self.names(query(under=os.path.join(self.root, "a"),
+                                          kind="dir")), ["a", "a/b"])
+        self.assertEqual(self.names(query(newer=1000, older=2000,
+                                          ext="txt")), ["a/b/2.TXT"])
+        self.assertEqual(self.names(query(kind="link")), ["link"])
+        self.assertEqual(len(query(uid=os.getuid())), len(self.objects))
+        self.assertEqual(query(uid=-1), [])
+
+    def test_rebuild(self):
+        first = self.objects.indexes
+        self.assertIs(self.objects.indexes, first)
+        self.assertIsInstance(first, index)
+        path = os.path.join(self.root, "6.txt")
+        with open(path, "w") as whdl:
+            whdl.write("6")
+        self.objects.add(scanner.object(path))
+        self.assertIsNot(self.objects.indexes, first)
+        self.assertEqual(len(self.objects.query(ext="txt")), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import inventory
+from xarg import scanner
+
+
+class test_inventory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scanner = scanner.load(paths=["xarg"])
+        cls.inventory = inventory.from_scanner(cls.scanner)
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_entries(self):
+        self.assertEqual(len(self.inventory), len(self.scanner))
+        for entry in self.inventory:
+            object = self.scanner[entry.path]
+            self.assertEqual(entry.size, object.size)
+            self.assertEqual(entry.mode, object.mode)
+            self.assertEqual(entry.uid, object.uid)
+            self.assertEqual(entry.gid, object.gid)
+            self.assertEqual(entry.mtime_ns, object.stat.st_mtime_ns)
+            self.assertEqual(entry.ino, object.stat.st_ino)
+            self.assertEqual(entry.isdir, object.isdir)
+            self.assertEqual(entry.isfile, object.isfile)
+            self.assertEqual(entry.islink, object.islink)
+            if entry.isfile:
+                self.assertEqual(entry.md5, object.md5)
+
+    def test_types(self):
+        self.assertEqual({entry.path for entry in self.inventory.dirs},
+                         {object.path for object in self.scanner.dirs})
+        self.assertEqual({entry.path for entry in self.inventory.files},
+                         {object.path for object in self.scanner.files})
+
+    def test_load(self):
+        with TemporaryDirectory() as thdl:
+            os.makedirs(os.path.join(thdl, "a", "b"))
+            with open(os.path.join(thdl, "a", "b", "c"), "w") as whdl:
+                whdl.write("unittest")
+            os.symlink("c", os.path.join(thdl, "a", "b", "d"))
+            inv = inventory.load(paths=[thdl])
+            objects = scanner.load(paths=[thdl])
+            self.assertEqual({entry.path for entry in inv},
+                             {object.path for object in objects})
+            self.assertEqual({entry.path for entry in inv.links},
+                             {object.path for object in objects.links})
+            for entry in inv.links:
+                object = entry.object
+                self.assertTrue(object.islink)
+                self.assertEqual(object.stat, entry.stat)
+                self.assertRaises(AssertionError, object.digest, "md5")
+            inv = inventory()
+            path = os.path.join(os.path.abspath(thdl), "a", "b", "c")
+            inv.add(scanner.object(path))
+            inv.add(scanner.object(os.path.dirname(path)))
+            self.assertEqual(len(inv), 2)
+            self.assertEqual({entry.path for entry in inv},
+                             {path, os.path.dirname(path)})
+            # directories are found by parent and name, not by path
+            inv.add(scanner.object(os.path.join(thdl, "a")))
+            inv.add(scanner.object(os.path.join(os.path.dirname(path), "d")))
+            self.assertEqual(len(inv.parents), len(path.split(os.sep)) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# coding:utf-8
+
+from hashlib import md5
+from hashlib import sha256
+import os
+import shutil
+import subprocess
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import hashcache
+from xarg import manifest
+from xarg import scanner
+
+
+class test_manifest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(os.path.join(self.tempdir.name, "root"))
+        os.makedirs(self.root)
+        self.names = ("a", "b c", "back\\slash", "new\nline")
+        for name in self.names:
+            with open(os.path.join(self.root, name), "w") as whdl:
+                whdl.write(name)
+        self.path = os.path.join(self.tempdir.name, "SHA256SUMS")
+        manifest.create(self.path, scanner.load(paths=[self.root]).files)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_create_and_parse(self):
+        entries = manifest.parse(self.path)
+        self.assertEqual(entries, sorted(
+            ((sha256(name.encode()).hexdigest(), os.path.join(self.root, name))
+             for name in self.names), key=lambda entry: entry[1]))
+        with open(self.path, encoding="utf-8") as rhdl:
+            lines = rhdl.read().splitlines()
+        self.assertEqual(len(lines), len(self.names))
+        self.assertTrue(any(line.startswith("\\") for line in lines))
+
+    @unittest.skipIf(shutil.which("sha256sum") is None, "no sha256sum")
+    def test_coreutils(self):
+        result = subprocess.run(["sha256sum", "-c", "--quiet", self.path],
+                                capture_output=True, check=False)
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+    def test_verify(self):
+        progress = []
+        report = manifest.verify(self.path, workers=2,
+                                 progress=lambda *args: progress.append(args))
+        self.assertTrue(report)
+        self.assertEqual(len(report.ok), len(self.names))
+        self.assertEqual(progress[-1], (4, 4))
+
+        with open(os.path.join(self.root, "a"), "w") as whdl:
+            whdl.write("changed")
+        os.remove(os.path.join(self.root, "b c"))
+        report = manifest.verify(self.path, fail_fast=False)
+        self.assertFalse(report)
+        self.assertEqual(report.failed, [os.path.join(self.root, "a")])
+        self.assertEqual(report.missing, [os.path.join(self.root, "b c")])
+        self.assertEqual(len(report.ok), 2)
+        report = manifest.verify(self.path)
+        self.assertTrue(report.stopped)
+        self.assertLess(len(report.ok), 2)
+
+    def test_md5_and_cache(self):
+        path = os.path.join(self.tempdir.name, "MD5SUMS")
+        with open(path, "w", encoding="utf-8") as whdl:
+            whdl.write(f"{md5(b'a').hexdigest()} *{self.root}/a\n")
+        with hashcache(os.path.join(self.tempdir.name, "cache")) as cache:
+            self.assertTrue(manifest.verify(path, cache=cache))
+            self.assertTrue(manifest.verify(path, cache=cache))
+            self.assertEqual(cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
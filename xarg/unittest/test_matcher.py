@@ -0,0 +1,83 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import chdir
+from xarg import matcher
+from xarg import scanner
+
+
+class test_matcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = matcher(["**/.git", "*.tmp", "build/**/cache",
+                               r"re:\.bak$", os.path.join("xarg", "test"),
+                               "[!a]x"])
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_glob(self):
+        self.assertIn(".git", self.matcher)
+        self.assertIn("a/b/.git", self.matcher)
+        self.assertNotIn("a/.gitignore", self.matcher)
+        self.assertIn("x.tmp", self.matcher)
+        self.assertIn("a/b/x.tmp", self.matcher)
+        self.assertIn("build/cache", self.matcher)
+        self.assertIn("build/a/b/cache", self.matcher)
+        self.assertNotIn("src/build/cache", self.matcher)
+        self.assertIn("a/bx", self.matcher)
+        self.assertNotIn("a/ax", self.matcher)
+
+    def test_regex(self):
+        self.assertIn("a.bak", self.matcher)
+        self.assertNotIn("a.bak.txt", self.matcher)
+
+    def test_path(self):
+        self.assertIn(os.path.join("xarg", "test"), self.matcher)
+        self.assertNotIn(os.path.join("xarg", "test", "a"), self.matcher)
+        self.assertFalse(matcher([]))
+        self.assertTrue(self.matcher)
+
+    def test_scanner_exclude(self):
+        with TemporaryDirectory() as thdl:
+            for name in (".git", "src", os.path.join("src", "node_modules")):
+                os.makedirs(os.path.join(thdl, name))
+                for file in ("a.py", "b.tmp"):
+                    with open(os.path.join(thdl, name, file), "w") as whdl:
+                        whdl.write(file)
+            objects = scanner.load(paths=[thdl], exclude=[
+                "**/.git", "*.tmp", "**/node_modules"])
+            self.assertEqual({os.path.relpath(obj.path, thdl)
+                              for obj in objects},
+                             {".", "src", os.path.join("src", "a.py")})
+
+    def test_scanner_exclude_curdir(self):
+        cwd = chdir()
+        with TemporaryDirectory() as thdl:
+            for name in ("build", os.path.join("build", "sub"), "src"):
+                os.makedirs(os.path.join(thdl, name))
+                with open(os.path.join(thdl, name, "a.py"), "w") as whdl:
+                    whdl.write(name)
+            cwd.pushd(thdl)
+            try:
+                objects = scanner.load(paths=["."], exclude=["build/**"])
+                self.assertEqual({obj.path for obj in objects},
+                                 {".", "build", "src",
+                                  os.path.join("src", "a.py")})
+            finally:
+                cwd.popd()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import predicate
+from xarg import scanner
+
+
+class test_predicate(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(os.path.join(self.tempdir.name, "root"))
+        os.makedirs(os.path.join(self.root, "a", "b", "c"))
+        for i, name in enumerate(("1.txt", "a/2.log", "a/b/3.txt",
+                                  "a/b/c/4.txt")):
+            path = os.path.join(self.root, name)
+            with open(path, "w") as whdl:
+                whdl.write("x" * i * 10)
+            os.utime(path, (i * 1000, i * 1000))
+        os.symlink("1.txt", os.path.join(self.root, "link"))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def scan(self, **kwargs):
+        objects = scanner.load(paths=[self.root], where=predicate(**kwargs))
+        return sorted(os.path.relpath(obj.path, self.root)
+                      for obj in objects)
+
+    def test_kind_and_name(self):
+        self.assertEqual(self.scan(kind="file"),
+                         ["1.txt", "a/2.log", "a/b/3.txt", "a/b/c/4.txt"])
+        self.assertEqual(self.scan(kind="dir"), [".", "a", "a/b", "a/b/c"])
+        self.assertEqual(self.scan(kind="link"), ["link"])
+        self.assertEqual(self.scan(name="*.txt"),
+                         ["1.txt", "a/b/3.txt", "a/b/c/4.txt"])
+        self.assertEqual(self.scan(name=("*.log", "l*")), ["a/2.log", "link"])
+
+    def test_stat(self):
+        self.assertEqual(self.scan(kind="file", min_size=10, max_size=20),
+                         ["a/2.log", "a/b/3.txt"])
+        self.assertEqual(self.scan(kind="file", newer=2000),
+                         ["a/b/3.txt", "a/b/c/4.txt"])
+        self.assertEqual(self.scan(kind="file", older=0), ["1.txt"])
+        self.assertEqual(self.scan(uid=os.getuid(), kind="dir"),
+                         [".", "a", "a/b", "a/b/c"])
+        self.assertEqual(self.scan(uid=-1), [])
+        self.assertEqual(len(self.scan(cnewer=0)), 9)
+
+    def test_prune(self):
+        self.assertEqual(self.scan(maxdepth=0), ["."])
+        self.assertEqual(self.scan(maxdepth=1),
+                         [".", "1.txt", "a", "link"])
+        self.assertEqual(self.scan(maxdepth=2, kind="file"),
+                         ["1.txt", "a/2.log"])
+        self.assertEqual(self.scan(xdev=True), self.scan())
+
+    def test_iterate(self):
+        where = predicate(name="*.txt", maxdepth=3)
+        objects = {os.path.relpath(obj.path, self.root) for obj in
+                   scanner.iterate(paths=[self.root], where=where)}
+        self.assertEqual(objects, {"1.txt", "a/b/3.txt"})
+        self.assertRaises(AssertionError, scanner.load, paths=[self.root],
+                          where=where, engine="listdir")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,24 @@
 #!/usr/bin/python3
 # coding:utf-8
 
+import asyncio
+from hashlib import md5
+from hashlib import sha256
+import io
 import os
 import shutil
+from tempfile import TemporaryDirectory
+import threading
 import unittest
 
+import mock
+
+from xarg import chdir
+from xarg import hasher
 from xarg import scanner
+from xarg.scanner import THDNUM_AUTO
+from xarg.scanner import THDNUM_DEFAULT
+from xarg.scanner import THDNUM_MINIMUM
 
 
 def handler(obj: scanner.object) -> bool:
@@ -82,3 +95,480 @@ class test_scanner(unittest.TestCase):
         object = scanner.object(path)
         self.scanner.add(object)
         self.assertIs(self.scanner[path], object)
+
+    def test_object_snapshot(self):
+        with TemporaryDirectory() as thdl:
+            path = os.path.join(thdl, "test")
+            with open(path, "w") as whdl:
+                whdl.write("unittest")
+            object = scanner.object(path)
+            live = scanner.object(path, snapshot=False)
+            self.assertEqual(object.size, 8)
+            self.assertEqual(live.size, 8)
+            with open(path, "a") as whdl:
+                whdl.write("snapshot")
+            self.assertEqual(object.size, 8)
+            self.assertEqual(live.size, 16)
+            self.assertIs(object.refresh(), object)
+            self.assertEqual(object.size, 16)
+            with open(path, "a") as whdl:
+                whdl.write("invalidate")
+            self.assertEqual(object.size, 16)
+            object.invalidate()
+            self.assertEqual(object.size, 26)
+            self.assertFalse(hasattr(object, "__dict__"))
+
+    def test_load_engines(self):
+        with TemporaryDirectory() as thdl:
+            os.makedirs(os.path.join(thdl, "a", "b"))
+            with open(os.path.join(thdl, "a", "b", "c"), "w") as whdl:
+                whdl.write("unittest")
+            os.symlink("missing", os.path.join(thdl, "a", "e"))
+            paths = {
+                engine: {obj.path for obj in scanner.load(paths=[thdl], engine=engine)}  # noqa:E501
+                for engine in ("scandir", "listdir")
+            }
+            self.assertEqual(paths["scandir"], paths["listdir"])
+            self.assertNotIn(os.path.relpath(os.path.join(thdl, "a", "e")),
+                             paths["scandir"])
+        self.assertRaises(AssertionError, scanner.load, paths=["xarg"],
+                          engine="unknown")
+
+    def test_load_curdir(self):
+        with TemporaryDirectory() as thdl:
+            for name in ("build", "src"):
+                os.makedirs(os.path.join(thdl, name))
+                with open(os.path.join(thdl, name, "a"), "w") as whdl:
+                    whdl.write(name)
+            cwd = chdir()
+            cwd.pushd(thdl)
+            try:
+                paths = {
+                    engine: {obj.path for obj in scanner.load(
+                        paths=["."], exclude=["build"], engine=engine)}
+                    for engine in ("scandir", "listdir")
+                }
+            finally:
+                cwd.popd()
+            self.assertEqual(paths["scandir"], paths["listdir"])
+            self.assertEqual(paths["scandir"],
+                             {".", "src", os.path.join("src", "a")})
+
+    def test_load_revisit(self):
+        with TemporaryDirectory() as thdl:
+            root = os.path.relpath(thdl)
+            os.makedirs(os.path.join(root, "a", "b"))
+            with open(os.path.join(root, "a", "b", "c"), "w") as whdl:
+                whdl.write("unittest")
+            os.symlink("b", os.path.join(root, "a", "d"))
+            os.symlink("..", os.path.join(root, "a", "b", "loop"))
+            revisits = {}
+
+            def revisit(obj: scanner.object, first: str):
+                revisits[obj.path] = first
+
+            objects = scanner.load(paths=[root], threads=4, revisit=revisit)
+            # real directories are always walked, not their links
+            self.assertEqual(revisits, {
+                os.path.join(root, "a", "d"): os.path.join(root, "a", "b"),
+                os.path.join(root, "a", "b", "loop"): os.path.join(root, "a"),
+            })
+            self.assertEqual([obj.path for obj in objects
+                              if os.path.basename(obj.path) == "c"],
+                             [os.path.join(root, "a", "b", "c")])
+
+    def test_load_revisit_link_first(self):
+        with TemporaryDirectory() as thdl:
+            root = os.path.relpath(os.path.join(thdl, "root"))
+            real = os.path.join(root, "real")
+            os.makedirs(os.path.join(real, "sub"))
+            for i in range(50):
+                with open(os.path.join(real, f"f{i}"), "w") as whdl:
+                    whdl.write(str(i))
+            # "alink" is listed before "real", "blink" is a link of a link
+            os.symlink("real", os.path.join(root, "alink"))
+            os.symlink(os.path.join("alink", "sub"),
+                       os.path.join(root, "blink"))
+            expected = {root, real, os.path.join(real, "sub"),
+                        os.path.join(root, "alink"),
+                        os.path.join(root, "blink")} | \
+                {os.path.join(real, f"f{i}") for i in range(50)}
+            for _ in range(20):
+                objects = scanner.load(paths=[root], threads=4)
+                self.assertEqual({obj.path for obj in objects}, expected)
+
+    def test_hash_files(self):
+        with TemporaryDirectory() as thdl:
+            datas = {}
+            for i in range(10):
+                path = os.path.join(thdl, f"file{i}")
+                datas[os.path.relpath(path)] = str(i).encode() * 1000 * i
+                with open(path, "wb") as whdl:
+                    whdl.write(datas[os.path.relpath(path)])
+            objects = scanner.load(paths=[thdl])
+            results = dict(objects.hash_files(algorithms=("md5", "sha256"),
+                                              workers=4, size=4096))
+            self.assertEqual(len(results), len(datas))
+            for object, digests in results.items():
+                data = datas[object.path]
+                self.assertEqual(digests["md5"], md5(data).hexdigest())
+                self.assertEqual(digests["sha256"], sha256(data).hexdigest())
+                self.assertEqual(object.digests, digests)
+                self.assertEqual(object.md5, digests["md5"])
+            for _ in objects.hash_files(workers=1):
+                break
+            # missing files are logged and skipped
+            missing = scanner.object(os.path.join(thdl, "missing"))
+            results = dict(scanner.hash_objects(
+                [missing] + list(objects.files), workers=2))
+            self.assertEqual(len(results), len(datas))
+            self.assertNotIn(missing, results)
+
+    def test_duplicate_files(self):
+        with TemporaryDirectory() as thdl:
+            def write(name: str, data: bytes) -> str:
+                path = os.path.join(thdl, name)
+                with open(path, "wb") as whdl:
+                    whdl.write(data)
+                return os.path.relpath(path)
+
+            large = os.urandom(64 * 1024)
+            same = {write("large1", large), write("large2", large)}
+            # same size, head and tail, different middle
+            write("large3", large[:1024] + bytes([large[1024] ^ 1]) +
+                  large[1025:])
+            small = {write("small1", b"small"), write("small2", b"small")}
+            write("small3", b"other")
+            empty = {write("empty1", b""), write("empty2", b"")}
+            os.link(os.path.join(thdl, "small1"), os.path.join(thdl, "small4"))
+            objects = scanner.load(paths=[thdl])
+            groups = [{obj.path for obj in group}
+                      for group in objects.duplicate_files(partial=512)]
+            self.assertEqual(len(groups), 3)
+            self.assertIn(same, groups)
+            self.assertIn(empty, groups)
+            self.assertTrue(any(len(group) == 2 and group & small
+                                for group in groups))
+            groups = [{obj.path for obj in group} for group in
+                      objects.duplicate_files(partial=512, hardlink=False)]
+            self.assertIn(small | {os.path.relpath(os.path.join(thdl, "small4"))},  # noqa:E501
+                          groups)
+
+    def test_hardlink(self):
+        with TemporaryDirectory() as thdl:
+            data = b"link" * 1000
+            path = os.path.join(thdl, "file0")
+            with open(path, "wb") as whdl:
+                whdl.write(data)
+            for i in range(1, 4):
+                os.link(path, os.path.join(thdl, f"file{i}"))
+            with open(os.path.join(thdl, "other"), "wb") as whdl:
+                whdl.write(b"other")
+            objects = scanner.load(paths=[thdl])
+            self.assertEqual(len(objects.inodes), 2)
+            inode = objects[os.path.relpath(path)].inode
+            self.assertEqual(len(objects.inodes[inode]), 4)
+            self.assertEqual(objects[os.path.relpath(path)].nlink, 4)
+            self.assertEqual(objects.total_size(), len(data) + 5)
+            self.assertEqual(objects.total_size(hardlink=False),
+                             len(data) * 4 + 5)
+            with mock.patch.object(hasher, "update_file", autospec=True,
+                                   side_effect=hasher.update_file) as update:
+                results = dict(objects.hash_files(workers=2))
+            self.assertEqual(update.call_count, 2)  # once per inode
+            self.assertEqual(len(results), 5)
+            for obj in objects.inodes[inode]:
+                self.assertEqual(results[obj]["md5"], md5(data).hexdigest())
+                self.assertEqual(obj.digests, results[obj])
+            results = dict(objects.hash_files(algorithms=("sha1",),
+                                              hardlink=False))
+            self.assertEqual(len(results), 5)
+
+    def test_load_paths(self):
+        with TemporaryDirectory() as thdl:
+            os.mkdir(os.path.join(thdl, "dir"))
+            paths = [os.path.join(thdl, "dir")]
+            for i in range(10):
+                path = os.path.join(thdl, "dir", f"file{i}")
+                with open(path, "w") as whdl:
+                    whdl.write(str(i))
+                paths.append(path)
+            missing = os.path.join(thdl, "missing")
+            stream = io.BytesIO(b"\0".join(os.fsencode(path) for path
+                                           in paths + [missing]) + b"\0")
+            names = list(scanner.read_paths(stream, null=True, size=7))
+            self.assertEqual(names, paths + [missing])
+            stream = io.StringIO("\n".join(paths) + "\n\n")
+            self.assertEqual(list(scanner.read_paths(stream)), paths)
+            objects = scanner.load_paths(names, threads=2, batch=3)
+            self.assertEqual(len(objects), 11)  # directory is not walked
+            self.assertEqual(len(objects.dirs), 1)
+            self.assertEqual(len(objects.files), 10)
+            self.assertNotIn(missing, objects)
+            objects = scanner.load_paths(
+                names, handler=lambda obj: obj.isfile)
+            self.assertEqual(len(objects), 10)
+            for objs in scanner.stat_paths(names, batch=1):
+                self.assertEqual(len(objs), 1)
+                break
+
+    def test_iterate(self):
+        paths = {obj.path for obj in scanner.load(paths=["xarg"])}
+        objects = scanner.iterate(paths=["xarg"], threads=2, qsize=2)
+        self.assertEqual({obj.path for obj in objects}, paths)
+        self.assertEqual(list(scanner.iterate(paths=[])), [])
+
+    def test_iterate_auto_threads(self):
+        paths = {obj.path for obj in scanner.load(paths=["xarg"])}
+        self.assertEqual({obj.path for obj in scanner.iterate(
+            paths=["xarg"], threads=THDNUM_AUTO)}, paths)
+        self.assertEqual({obj.path for obj in scanner.load(
+            paths=["xarg"], threads=THDNUM_AUTO, engine="listdir")}, paths)
+        # 0 (THDNUM_DEFAULT of a single CPU) clamps to one thread, it is not
+        # auto
+        self.assertLess(THDNUM_AUTO, THDNUM_MINIMUM)
+        names = set()
+
+        def record(obj: scanner.object) -> bool:
+            names.add(threading.current_thread().name)
+            return True
+
+        for threads in (0, THDNUM_DEFAULT):
+            names.clear()
+            list(scanner.iterate(paths=["xarg"], threads=threads,
+                                 handler=record))
+            self.assertLessEqual(len(names), max(THDNUM_MINIMUM, threads))
+
+    def test_iterate_break(self):
+        objects = scanner.iterate(paths=["xarg"], threads=2, qsize=1)
+        self.assertIsInstance(next(objects), scanner.object)
+        objects.close()
+        self.assertFalse(any(thread.name.startswith("xarg-scan")
+                             for thread in threading.enumerate()))
+
+    def test_aiter(self):
+        async def collect():
+            return {obj.path async for obj in
+                    scanner.aiter(paths=["xarg"], threads=2, batch=8)}
+
+        self.assertEqual(asyncio.run(collect()),
+                         {obj.path for obj in scanner.load(paths=["xarg"])})
+
+    def test_aiter_cancel(self):
+        async def scan():
+            async for _ in scanner.aiter(paths=["xarg"], threads=2, batch=1):
+                await asyncio.sleep(10)
+
+        async def cancel():
+            task = asyncio.create_task(scan())
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        self.assertFalse(any(thread.name.startswith("xarg-scan")
+                             for thread in threading.enumerate()))
+
+    def test_ahash_files(self):
+        objects = scanner.load(paths=["xarg"])
+
+        async def collect():
+            return {obj.path: digests async for obj, digests in
+                    objects.ahash_files(algorithms=("md5", "sha256"))}
+
+        self.assertEqual(asyncio.run(collect()),
+                         {obj.path: digests for obj, digests in
+                          objects.hash_files(algorithms=("md5", "sha256"))})
+
+    def test_sharded(self):
+        objects = scanner.load(paths=["xarg"])
+        with mock.patch.object(scanner, "sharded", autospec=True,
+                               side_effect=scanner.sharded) as shard:
+            scanner.load(paths=["xarg"], threads=8, processes=2)
+            self.assertEqual(shard.call_args.kwargs["threads"], 4)
+        self.assertRaises(AssertionError, scanner.load, paths=["xarg"],
+                          processes=2, revisit=lambda obj, path: None)
+        sharded = scanner.load(paths=["xarg"], processes=2)
+        self.assertEqual(sharded.roots, objects.roots)
+        self.assertEqual({obj.path: obj.record for obj in sharded},
+                         {obj.path: obj.record for obj in objects})
+        weights = objects.weights()
+        self.assertEqual(weights["xarg"], len(objects))
+        self.assertEqual(weights[os.path.join("xarg", "unittest")],
+                         len([obj for obj in objects if obj.path.startswith(
+                             os.path.join("xarg", "unittest", ""))]) + 1)
+        balanced = scanner.sharded(paths=["xarg"], processes=4,
+                                   previous=objects)
+        self.assertEqual({obj.path for obj in balanced},
+                         {obj.path for obj in objects})
+        balanced = scanner.load(paths=["xarg"], processes=2,
+                                previous=objects)
+        self.assertEqual({obj.path for obj in balanced},
+                         {obj.path for obj in objects})
+
+    def test_sharded_curdir(self):
+        cwd = chdir()
+        with TemporaryDirectory() as thdl:
+            for name in ("a", "b", "build"):
+                os.makedirs(os.path.join(thdl, name))
+                with open(os.path.join(thdl, name, "x.log"), "w") as whdl:
+                    whdl.write(name)
+            with open(os.path.join(thdl, "x.log"), "w") as whdl:
+                whdl.write("x")
+            cwd.pushd(thdl)
+            try:
+                objects = scanner.load(paths=["."], exclude=["x.log",
+                                                             "build"])
+                self.assertEqual({obj.path for obj in objects},
+                                 {".", "a", "b", os.path.join("a", "x.log"),
+                                  os.path.join("b", "x.log")})
+                weights = objects.weights()
+                self.assertEqual(weights[os.curdir], 5)
+                self.assertEqual(weights["a"], 2)
+                self.assertEqual(weights["b"], 2)
+                sharded = scanner.load(paths=["."], exclude=["x.log",
+                                                             "build"],
+                                       processes=2, previous=objects)
+                self.assertEqual({obj.path for obj in sharded},
+                                 {obj.path for obj in objects})
+            finally:
+                cwd.popd()
+
+    def test_refresh(self):
+        with TemporaryDirectory() as thdl:
+            root = os.path.relpath(os.path.join(thdl, "root"))
+            for name in ("a", "b"):
+                os.makedirs(os.path.join(root, name))
+                for i in range(3):
+                    with open(os.path.join(root, name, f"{i}"), "w") as whdl:
+                        whdl.write(name)
+            for name in (".", "a", "b"):  # coarse timestamps
+                os.utime(os.path.join(root, name), ns=(0, 0))
+            snapshot = os.path.join(thdl, "snapshot")
+            objects = scanner.load(paths=[root])
+            objects.save(snapshot)
+            restored = scanner.restore(snapshot)
+            self.assertEqual(restored.roots, (root,))
+            self.assertEqual({obj.path for obj in restored},
+                             {obj.path for obj in objects})
+            obj = restored[os.path.join(root, "a", "0")]
+            self.assertEqual(obj.record, objects[obj.path].record)
+
+            with open(os.path.join(root, "a", "3"), "w") as whdl:
+                whdl.write("added")
+            os.remove(os.path.join(root, "a", "0"))
+            with open(os.path.join(root, "b", "0"), "w") as whdl:
+                whdl.write("modified")
+
+            refreshed, changes = scanner.refresh(snapshot)
+            self.assertEqual({obj.path for obj in changes.added},
+                             {os.path.join(root, "a", "3")})
+            self.assertEqual({obj.path for obj in changes.removed},
+                             {os.path.join(root, "a", "0")})
+            self.assertNotIn(os.path.join(root, "b", "0"),
+                             {obj.path for obj in changes.modified})
+            unchanged = os.path.join(root, "b", "1")
+            self.assertIn(unchanged, refreshed)
+            _, changes = scanner.refresh(objects, restat=True)
+            self.assertIn(os.path.join(root, "b", "0"),
+                          {obj.path for obj in changes.modified})
+            refreshed, changes = scanner.refresh(objects)
+            self.assertIs(refreshed[unchanged], objects[unchanged])
+
+    def test_export(self):
+        with TemporaryDirectory() as thdl:
+            root = os.path.relpath(os.path.join(thdl, "root"))
+            os.makedirs(os.path.join(root, "a"))
+            for i in range(5):
+                with open(os.path.join(root, "a", f"{i}"), "w") as whdl:
+                    whdl.write(str(i))
+            os.symlink("0", os.path.join(root, "a", "link"))
+            stream = io.StringIO()
+            count = scanner.export(scanner.iterate(paths=[root]), stream,
+                                   roots=[root])
+            self.assertEqual(count, 8)
+            self.assertEqual(len(stream.getvalue().splitlines()), 9)
+            stream.seek(0)
+            restored = scanner.restore(stream)
+            objects = scanner.load(paths=[root])
+            self.assertEqual(restored.roots, (root,))
+            self.assertEqual(len(restored.links), 1)
+            self.assertEqual({obj.path for obj in restored},
+                             {obj.path for obj in objects})
+            self.assertFalse(scanner.diff(objects, restored))
+
+            for obj in objects.files - objects.links:
+                obj.digest("md5")
+            output = os.path.join(thdl, "export.jsonl")
+            self.assertEqual(scanner.export(objects, output), 8)
+            restored = scanner.restore(output)
+            path = os.path.join(root, "a", "1")
+            self.assertEqual(restored[path].digests, objects[path].digests)
+            self.assertFalse(scanner.diff(output, objects, content=True))
+
+    def test_refresh_curdir(self):
+        with TemporaryDirectory() as thdl:
+            os.makedirs(os.path.join(thdl, "a"))
+            for name in ("0", os.path.join("a", "1")):
+                with open(os.path.join(thdl, name), "w") as whdl:
+                    whdl.write(name)
+            cwd = chdir()
+            cwd.pushd(thdl)
+            try:
+                objects = scanner.load(paths=["."])
+                refreshed, changes = scanner.refresh(objects)
+            finally:
+                cwd.popd()
+            self.assertFalse(changes)
+            self.assertEqual({obj.path for obj in refreshed},
+                             {".", "0", "a", os.path.join("a", "1")})
+            self.assertIs(refreshed["0"], objects["0"])
+
+    def test_diff(self):
+        with TemporaryDirectory() as thdl:
+            root = os.path.relpath(os.path.join(thdl, "root"))
+            os.makedirs(os.path.join(root, "a"))
+            for name in ("0", "1", "2", "3"):
+                with open(os.path.join(root, "a", name), "w") as whdl:
+                    whdl.write(name)
+            old = scanner.load(paths=[root])
+            for obj in old.files:
+                obj.digest("md5")
+            snapshot = os.path.join(thdl, "old")
+            old.save(snapshot)
+
+            os.remove(os.path.join(root, "a", "0"))
+            with open(os.path.join(root, "a", "1"), "w") as whdl:
+                whdl.write("modified")
+            with open(os.path.join(root, "a", "4"), "w") as whdl:
+                whdl.write("added")
+            self.assertFalse(scanner.diff(snapshot, scanner.restore(snapshot)))
+
+            new = scanner.load(paths=[root])
+            for obj in new.files:
+                obj.digest("md5")
+            # same size and mtime, different content
+            path = os.path.join(root, "a", "2")
+            record = new[path].record
+            record["digests"] = {"md5": "0" * 32}
+            fake = scanner(roots=[root])
+            for obj in new:
+                fake.add(scanner.object.from_record(record)
+                         if obj.path == path else obj)
+            for source in (old, snapshot):
+                changes = scanner.diff(source, fake, content=True)
+                self.assertEqual([obj.path for obj in changes.added],
+                                 [os.path.join(root, "a", "4")])
+                self.assertEqual([obj.path for obj in changes.removed],
+                                 [os.path.join(root, "a", "0")])
+                modified = {obj.path for obj in changes.modified}
+                self.assertIn(os.path.join(root, "a", "1"), modified)
+                self.assertNotIn(path, modified)
+                self.assertEqual([obj.path for obj in changes.content],
+                                 [path])
+            self.assertFalse(scanner.diff(fake, fake, content=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# coding:utf-8
+
+from threading import Lock
+from threading import current_thread
+from time import sleep
+import unittest
+
+from xarg.thread import concurrency
+from xarg.thread import work_stealing
+
+
+class test_work_stealing(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_tree(self):
+        lock = Lock()
+        done = []
+
+        def task(depth: int):
+            with lock:
+                done.append(depth)
+            if depth < 6:
+                scheduler.extend([depth + 1] * 3)
+
+        scheduler = work_stealing(target=task, workers=4, name="test-work")
+        with scheduler:
+            scheduler.push(0)
+        self.assertTrue(scheduler.stopped)
+        self.assertEqual(scheduler.pending, 0)
+        self.assertEqual(len(done), sum(3 ** i for i in range(7)))
+
+    def test_error(self):
+        def task(item: int):
+            if item == 5:
+                raise ValueError(item)
+
+        scheduler = work_stealing(target=task, workers=2)
+        scheduler.startup()
+        scheduler.extend(range(10))
+        self.assertRaises(ValueError, scheduler.join)
+
+    def test_stop(self):
+        exits = []
+
+        def task(item: int):
+            if item == 0:
+                scheduler.stop()
+            scheduler.push(item + 1)
+
+        scheduler = work_stealing(target=task, workers=3,
+                                  finalizer=lambda: exits.append(1))
+        scheduler.startup()
+        scheduler.push(0)
+        scheduler.join()
+        self.assertTrue(scheduler.stopped)
+        self.assertEqual(len(exits), 3)
+
+    def test_resize(self):
+        lock = Lock()
+        names = set()
+
+        def task(depth: int):
+            with lock:
+                names.add(current_thread().name)
+            if depth < 4:
+                scheduler.extend([depth + 1] * 3)
+            if depth == 3:
+                scheduler.resize(4)
+
+        scheduler = work_stealing(target=task, workers=4, name="test-work")
+        self.assertEqual(scheduler.resize(0), 1)
+        self.assertEqual(scheduler.resize(8), 4)
+        self.assertEqual(scheduler.resize(2), 2)
+        scheduler.startup()
+        scheduler.push(0)
+        scheduler.join()
+        self.assertEqual(scheduler.active, 4)
+        self.assertEqual(scheduler.pending, 0)
+        self.assertLessEqual(len(names), 4)
+
+
+class test_concurrency(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_interval(self, tuner: concurrency, ops: int,
+                     queued: int = 100) -> int:
+        for _ in range(ops):
+            tuner.record(0.001)
+        sleep(tuner.interval * 2)
+        return tuner.adjust(queued)
+
+    def test_adjust(self):
+        tuner = concurrency(initial=4, maximum=16, interval=0.02)
+        self.assertEqual(tuner.adjust(100), 4)  # within the interval
+        self.assertEqual(self.run_interval(tuner, 1000), 6)  # grow
+        self.assertEqual(self.run_interval(tuner, 100), 5)  # turn back
+        self.assertEqual(tuner.best[0], 4)
+        self.assertGreater(tuner.best[1], tuner.rate)
+        self.assertEqual(self.run_interval(tuner, 1000, queued=2), 2)
+        self.assertEqual(self.run_interval(tuner, 0, queued=0), 1)
+        tuner.report()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# coding:utf-8
+
+import os
+from tempfile import TemporaryDirectory
+import unittest
+
+from xarg import scanner
+from xarg import usage
+
+
+class test_usage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(os.path.join(self.tempdir.name, "root"))
+        os.makedirs(os.path.join(self.root, "a", "b"))
+        os.makedirs(os.path.join(self.root, "c"))
+        for name, size in (("a/1", 100), ("a/b/2", 200), ("a/b/3", 300),
+                           ("c/4", 40000)):
+            with open(os.path.join(self.root, name), "w") as whdl:
+                whdl.write("x" * size)
+        os.link(os.path.join(self.root, "a", "b", "3"),
+                os.path.join(self.root, "c", "5"))
+        os.utime(os.path.join(self.root, "a", "b", "2"), (0, 10 ** 10))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_rollup(self):
+        result = usage.load(paths=[self.root])
+        self.assertEqual([node.path for node in result.roots], [self.root])
+        root = result[self.root]
+        dirsize = sum(os.stat(os.path.join(self.root, name)).st_size
+                      for name in (".", "a", "a/b", "c"))
+        self.assertEqual(root.files, 4)  # hard link counted once
+        self.assertEqual(root.size, 40600 + dirsize)
+        self.assertGreater(root.blocks, 0)
+        # the first scanned path of the hard link is counted
+        a = result[os.path.join(self.root, "a")]
+        c = result[os.path.join(self.root, "c")]
+        self.assertEqual(a.files + c.files, 4)
+        self.assertIn(a.files, (2, 3))
+        self.assertGreaterEqual(a.mtime_ns, 10 ** 19)
+        self.assertEqual([node.path for node in root.sorted()],
+                         [os.path.join(self.root, "c"),
+                          os.path.join(self.root, "a")])
+        self.assertEqual(result.sorted()[0], root)
+        self.assertEqual(len(list(root.walk())), 4)
+
+    def test_from_scanner(self):
+        objects = scanner.load(paths=[self.root])
+        result = usage.from_scanner(objects)
+        loaded = usage.load(paths=[self.root])
+        self.assertEqual(len(result), len(loaded))
+        self.assertEqual(result[self.root].size, loaded[self.root].size)
+        self.assertEqual(result[self.root].files, loaded[self.root].files)
+        path = os.path.join(self.root, "c", "6")
+        with open(path, "w") as whdl:
+            whdl.write("6")
+        result.add(scanner.object(path))
+        self.assertEqual(result[self.root].files, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+# coding:utf-8
+
+import os
+import shutil
+from tempfile import TemporaryDirectory
+import unittest
+from unittest import mock
+
+from xarg import chdir
+from xarg import scanner
+from xarg.watcher import EVENT_ADDED
+from xarg.watcher import EVENT_MODIFIED
+from xarg.watcher import EVENT_REMOVED
+
+
+class test_watcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.root = os.path.relpath(os.path.join(self.tempdir.name, "root"))
+        os.makedirs(os.path.join(self.root, "a"))
+        with open(os.path.join(self.root, "a", "1"), "w") as whdl:
+            whdl.write("1")
+        self.watcher = scanner.watch(paths=[self.root], latency=0.05)
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tempdir.cleanup()
+
+    def changes(self, count: int):
+        events = []
+        while len(events) < count:
+            polled = self.watcher.poll(timeout=2)
+            if not polled:
+                break
+            events.extend(polled)
+        return {(event.kind, event.path) for event in events}
+
+    def test_initial(self):
+        objects = self.watcher.objects
+        self.assertEqual(len(objects), 3)
+        self.assertEqual(len(objects.dirs), 2)
+        self.assertEqual(self.watcher.watches, 2)
+
+    def test_file(self):
+        path = os.path.join(self.root, "a", "2")
+        with open(path, "w") as whdl:
+            whdl.write("2")
+        changes = self.changes(1)
+        self.assertIn((EVENT_ADDED, path), changes)
+        self.assertIn(path, self.watcher.objects)
+        self.assertEqual(len(self.watcher.objects.files), 2)
+
+        os.utime(path, (0, 10 ** 9))
+        self.assertIn((EVENT_MODIFIED, path), self.changes(1))
+        self.assertEqual(self.watcher.objects[path].stat.st_mtime, 10 ** 9)
+
+        os.remove(path)
+        self.assertIn((EVENT_REMOVED, path), self.changes(1))
+        self.assertNotIn(path, self.watcher.objects)
+        self.assertEqual(len(self.watcher.objects.files), 1)
+
+    def test_dir(self):
+        path = os.path.join(self.root, "b")
+        os.makedirs(os.path.join(path, "c"))
+        with open(os.path.join(path, "c", "3"), "w") as whdl:
+            whdl.write("3")
+        changes = self.changes(3)
+        for name in ("b", "b/c", "b/c/3"):
+            sub = os.path.join(self.root, name)
+            self.assertIn((EVENT_ADDED, sub), changes)
+            self.assertIn(sub, self.watcher.objects)
+        self.assertEqual(self.watcher.watches, 4)
+
+        # entries of the new directory are watched
+        sub = os.path.join(path, "c", "4")
+        with open(sub, "w") as whdl:
+            whdl.write("4")
+        self.assertIn((EVENT_ADDED, sub), self.changes(1))
+
+        shutil.rmtree(path)
+        changes = self.changes(4)
+        self.assertIn((EVENT_REMOVED, path), changes)
+        self.assertIn((EVENT_REMOVED, sub), changes)
+        self.assertEqual(len(self.watcher.objects), 3)
+        self.assertEqual(self.watcher.watches, 2)
+
+    def test_remove_subtree(self):
+        path = os.path.join(self.root, "b")
+        os.makedirs(os.path.join(path, "c"))
+        names = [os.path.join(path, f"{i}") for i in range(10)] + \
+            [os.path.join(path, "c", "d")]
+        for name in names:
+            with open(name, "w") as whdl:
+                whdl.write(name)
+        changes = self.changes(len(names) + 2)
+        for name in names:
+            self.assertIn((EVENT_ADDED, name), changes)
+        # removed entries are found without going through all objects
+        with mock.patch.object(scanner, "__iter__",
+                               side_effect=AssertionError):
+            for name in names[:5]:
+                os.remove(name)
+            changes = self.changes(5)
+            for name in names[:5]:
+                self.assertIn((EVENT_REMOVED, name), changes)
+            shutil.rmtree(path)
+            changes = self.changes(len(names) - 3)
+        self.assertEqual({sub for kind, sub in changes
+                          if kind == EVENT_REMOVED},
+                         {path, os.path.join(path, "c")} | set(names[5:]))
+        self.assertEqual({obj.path for obj in self.watcher.objects},
+                         {self.root, os.path.join(self.root, "a"),
+                          os.path.join(self.root, "a", "1")})
+        self.assertEqual(self.watcher.watches, 2)
+
+    def test_events(self):
+        path = os.path.join(self.root, "a", "2")
+        with open(path, "w") as whdl:
+            whdl.write("2")
+        events = list(self.watcher.events(timeout=0.5))
+        self.assertIn(path, [event.path for event in events])
+
+    def test_curdir(self):
+        self.watcher.close()
+        cwd = chdir()
+        cwd.pushd(self.root)
+        try:
+            with scanner.watch(paths=["."], latency=0.05) as watcher:
+                self.watcher = watcher
+                with open("y", "w") as whdl:
+                    whdl.write("y")
+                self.assertIn((EVENT_ADDED, "y"), self.changes(1))
+                os.utime("y", (0, 10 ** 9))
+                self.assertIn((EVENT_MODIFIED, "y"), self.changes(1))
+                os.remove("y")
+                self.assertIn((EVENT_REMOVED, "y"), self.changes(1))
+                self.assertNotIn("y", watcher.objects)
+                shutil.rmtree("a")
+                self.assertIn((EVENT_REMOVED, os.path.join("a", "1")),
+                              self.changes(2))
+                self.assertEqual({obj.path for obj in watcher.objects},
+                                 {"."})
+        finally:
+            cwd.popd()
+
+
+if __name__ == "__main__":
+    unittest.main()
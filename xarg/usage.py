@@ -0,0 +1,181 @@
+# coding:utf-8
+
+import os
+import stat
+from typing import Callable
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from .scanner import THDNUM_DEFAULT
+from .scanner import scanner
+
+BLOCK_SIZE = 512  # unit of st_blocks
+SORT_KEYS = ("size", "blocks", "files", "mtime_ns", "path")
+
+
+class usage:
+    '''du-style recursive totals of directories
+
+    Objects are accumulated into their parent directory as they are
+    scanned (with the captured stat, symbolic links are not followed),
+    totals are rolled up bottom-up once the walk is done. Inodes with
+    several hard links are counted once.
+    '''
+
+    class node:  # pylint: disable=too-few-public-methods
+        '''recursive totals of a directory (or a scanned file)'''
+
+        __slots__ = ("path", "size", "blocks", "files", "mtime_ns",
+                     "children")
+
+        def __init__(self, path: str):
+            self.path: str = path
+            self.size: int = 0  # apparent bytes
+            self.blocks: int = 0  # allocated bytes
+            self.files: int = 0  # non-directory entries
+            self.mtime_ns: int = 0  # newest mtime
+            self.children: List[usage.node] = []
+
+        def __repr__(self) -> str:
+            return f"usage.node({self.path!r}, size={self.size}, " \
+                f"blocks={self.blocks}, files={self.files})"
+
+        def add(self, size: int, blocks: int, files: int, mtime_ns: int):
+            self.size += size
+            self.blocks += blocks
+            self.files += files
+            self.mtime_ns = max(self.mtime_ns, mtime_ns)
+
+        def sorted(self, key: str = "size",
+                   reverse: bool = True) -> List["usage.node"]:
+            '''children sorted by total, the largest first'''
+            assert key in SORT_KEYS, f"unknown sort key '{key}'"
+            return sorted(self.children, key=lambda node: getattr(node, key),
+                          reverse=reverse)
+
+        def walk(self) -> Generator["usage.node", None, None]:
+            '''yield this node and all descendants, top-down'''
+            nodes = [self]
+            while nodes:
+                node = nodes.pop()
+                yield node
+                nodes.extend(node.children)
+
+    def __init__(self, roots: Sequence[str] = ()):
+        self.__roots: Tuple[str, ...] = tuple(scanner.rpath(root)
+                                              for root in roots)
+        self.__owns: Dict[str, usage.node] = {}  # totals of own entries
+        self.__nodes: Dict[str, usage.node] = {}
+        self.__inodes: Set[Tuple[int, int]] = set()
+        self.__rolled: bool = True
+
+    def __len__(self) -> int:
+        return len(self.__owns)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.__owns
+
+    def __getitem__(self, path: str) -> node:
+        self.rollup()
+        return self.__nodes[path]
+
+    def __iter__(self) -> Generator[node, None, None]:
+        self.rollup()
+        return (node for node in self.__nodes.values())
+
+    @property
+    def roots(self) -> List[node]:
+        '''top-level nodes'''
+        self.rollup()
+        return [node for path, node in self.__nodes.items()
+                if self.parent(path) not in self.__nodes or
+                self.parent(path) == path]
+
+    @classmethod
+    def parent(cls, path: str) -> str:
+        '''parent directory, "." of relative top-level paths'''
+        return os.path.dirname(path) or os.curdir
+
+    def __own(self, path: str) -> node:
+        node = self.__owns.get(path)
+        if node is None:
+            node = usage.node(path)
+            self.__owns[path] = node
+        return node
+
+    def add(self, obj: scanner.object):
+        '''accumulate the captured metadata of object'''
+        assert isinstance(obj, scanner.object)
+        result = obj.lstat if obj.islink else obj.stat
+        isdir = stat.S_ISDIR(result.st_mode)
+        if not isdir and result.st_nlink > 1:
+            inode = (result.st_dev, result.st_ino)
+            if inode in self.__inodes:
+                return
+            self.__inodes.add(inode)
+        if isdir or obj.path in self.__roots:
+            node = self.__own(obj.path)
+        else:
+            node = self.__own(self.parent(obj.path))
+        node.add(result.st_size, getattr(result, "st_blocks", 0) * BLOCK_SIZE,
+                 0 if isdir else 1, result.st_mtime_ns)
+        self.__rolled = False
+
+    def rollup(self):
+        '''add totals of subdirectories into parents, deepest first'''
+        if self.__rolled:
+            return
+        nodes: Dict[str, usage.node] = {}
+        for path, own in self.__owns.items():
+            node = usage.node(path)
+            node.add(own.size, own.blocks, own.files, own.mtime_ns)
+            nodes[path] = node
+        for path in sorted(nodes, key=lambda p: p.count(os.sep),
+                           reverse=True):
+            parent = self.parent(path)
+            if parent != path and parent in nodes:
+                node = nodes[path]  # all subdirectories are added
+                nodes[parent].children.append(node)
+                nodes[parent].add(node.size, node.blocks, node.files,
+                                  node.mtime_ns)
+        self.__nodes = nodes
+        self.__rolled = True
+
+    def sorted(self, key: str = "size",
+               reverse: bool = True) -> List[node]:
+        '''all nodes sorted by total, the largest first'''
+        assert key in SORT_KEYS, f"unknown sort key '{key}'"
+        return sorted(self, key=lambda node: getattr(node, key),
+                      reverse=reverse)
+
+    @classmethod
+    def from_scanner(cls, objects: scanner) -> "usage":
+        result = usage(roots=objects.roots)
+        for obj in objects:
+            result.add(obj)
+        result.rollup()
+        return result
+
+    @classmethod
+    def load(cls,  # pylint: disable=R0913,R0917
+             paths: Sequence[str],
+             exclude: Optional[Sequence[str]] = None,
+             linkdir: bool = False,
+             threads: int = THDNUM_DEFAULT,
+             handler: Optional[Callable[[scanner.object], bool]] = None
+             ) -> "usage":
+        '''scan paths and accumulate totals during the walk, objects are
+        not kept, symbolic link dirs are not followed by default (as du)
+        '''
+        result = usage(roots=paths)
+        for obj in scanner.iterate(paths=paths, exclude=exclude,
+                                   linkdir=linkdir, threads=threads,
+                                   handler=handler):
+            result.add(obj)
+        result.rollup()
+        return result
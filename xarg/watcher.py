@@ -0,0 +1,345 @@
+# coding:utf-8
+
+import ctypes
+import ctypes.util
+import errno
+import os
+from select import select
+import struct
+from time import time
+from typing import Callable
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+
+from .actuator import commands
+from .scanner import THDNUM_DEFAULT
+from .scanner import scanner
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+    IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+# entries of the directory are added or removed, its mtime is changed
+IN_DIR_CHANGED = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")
+EVENT_BUFFER = 64 * 1024
+EVENT_ADDED = "added"
+EVENT_REMOVED = "removed"
+EVENT_MODIFIED = "modified"
+
+
+class inotify:
+    '''minimal inotify binding via ctypes (Linux only)'''
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not supported")
+        self.__libc = libc
+        self.__fd: int = self.__check(libc.inotify_init1(IN_NONBLOCK |
+                                                         IN_CLOEXEC))
+
+    @classmethod
+    def __check(cls, result: int) -> int:
+        if result < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        return result
+
+    @property
+    def fd(self) -> int:
+        return self.__fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        return self.__check(self.__libc.inotify_add_watch(
+            self.__fd, os.fsencode(path), ctypes.c_uint32(mask)))
+
+    def rm_watch(self, wd: int):
+        self.__libc.inotify_rm_watch(self.__fd, wd)
+
+    def read(self) -> Generator[tuple, None, None]:
+        '''yield (wd, mask, cookie, name) of pending events'''
+        try:
+            data = os.read(self.__fd, EVENT_BUFFER)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, cookie, name
+
+    def close(self):
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+
+class watcher:  # pylint: disable=too-many-instance-attributes
+    '''keep a scanner result current with inotify events
+
+    After the initial walk every directory is watched, bursts of events
+    are coalesced by path (until no event arrives for `latency` seconds,
+    at most `max_latency`), then each changed path is stat'ed once and
+    the scanner (and its `dirs`/`files`/`links`) is updated in place.
+    New directories are walked and watched, if the kernel queue overflows
+    the whole tree is refreshed (see `scanner.refresh()`).
+
+    The scanner is updated in the thread which consumes the events, by
+    `poll()` or `events()`.
+    '''
+
+    class event:  # pylint: disable=too-few-public-methods
+        '''added, removed or modified object'''
+
+        __slots__ = ("kind", "object")
+
+        def __init__(self, kind: str, obj: scanner.object):
+            self.kind: str = kind
+            self.object: scanner.object = obj
+
+        def __repr__(self) -> str:
+            return f"watcher.event({self.kind}, {self.object.path!r})"
+
+        @property
+        def path(self) -> str:
+            return self.object.path
+
+    def __init__(self,  # pylint: disable=R0913,R0917
+                 paths: Sequence[str],
+                 exclude: Optional[Sequence[str]] = None,
+                 linkdir: bool = False,
+                 threads: int = THDNUM_DEFAULT,
+                 handler: Optional[Callable[[scanner.object], bool]] = None,
+                 latency: float = 0.1,
+                 max_latency: float = 1.0):
+        self.__cmds: commands = commands()
+        self.__paths: Sequence[str] = paths
+        self.__exclude: Sequence[str] = exclude or []
+        self.__filter = scanner.path_filter(self.__exclude)
+        self.__linkdir: bool = linkdir
+        self.__threads: int = threads
+        self.__handler = handler
+        self.__latency: float = latency
+        self.__max_latency: float = max(latency, max_latency)
+        self.__inotify: inotify = inotify()
+        self.__wds: Dict[int, str] = {}
+        self.__wdindex: Dict[str, int] = {}
+        # entry paths of each directory, subtrees are removed without
+        # going through the whole scanner
+        self.__children: Dict[str, Set[str]] = {}
+        self.__scanner: scanner = scanner(roots=paths)
+        for obj in self.__walk(paths):
+            self.__add(obj)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def objects(self) -> scanner:
+        '''the scan result kept current'''
+        return self.__scanner
+
+    @property
+    def watches(self) -> int:
+        '''number of watched directories'''
+        return len(self.__wds)
+
+    def close(self):
+        self.__inotify.close()
+        self.__wds.clear()
+        self.__wdindex.clear()
+
+    @classmethod
+    def __parent(cls, path: str) -> str:
+        # top-level entries of root "." are under "." (not "")
+        return os.path.dirname(path) or os.curdir
+
+    def __add(self, obj: scanner.object):
+        self.__scanner.add(obj)
+        parent = self.__parent(obj.path)
+        if parent != obj.path:
+            self.__children.setdefault(parent, set()).add(obj.path)
+
+    def __discard(self, path: str) -> Optional[scanner.object]:
+        parent = self.__parent(path)
+        if parent in self.__children:
+            self.__children[parent].discard(path)
+        return self.__scanner.remove(path)
+
+    def __watch(self, obj: scanner.object):
+        if not obj.isdir or (obj.islink and not self.__linkdir):
+            return
+        mask = IN_WATCH_MASK | IN_ONLYDIR
+        if not self.__linkdir:
+            mask |= IN_DONT_FOLLOW
+        try:
+            wd = self.__inotify.add_watch(obj.path, mask)
+            self.__wds[wd] = os.path.normpath(obj.path)
+            self.__wdindex[self.__wds[wd]] = wd
+        except OSError as error:  # e.g. ENOSPC: max_user_watches
+            self.__cmds.logger.warning("watch %s error: %s", obj.path, error)
+
+    def __walk(self, paths: Sequence[str]
+               ) -> Generator[scanner.object, None, None]:
+        for obj in scanner.iterate(paths=paths, exclude=self.__exclude,
+                                   linkdir=self.__linkdir,
+                                   threads=self.__threads,
+                                   handler=self.__handler):
+            self.__watch(obj)
+            yield obj
+
+    def __read(self, dirty: Set[str]) -> bool:
+        '''collect changed paths, return True if the queue overflowed'''
+        overflow = False
+        for wd, mask, _, name in self.__inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:  # watch removed
+                path = self.__wds.pop(wd, None)
+                if path is not None and self.__wdindex.get(path) == wd:
+                    del self.__wdindex[path]
+                continue
+            path = self.__wds.get(wd)
+            if path is None:
+                continue
+            if name:  # normalized as scanner keys, e.g. "a" not "./a"
+                dirty.add(os.path.normpath(os.path.join(path, name)))
+                if mask & IN_DIR_CHANGED:
+                    dirty.add(path)
+            else:  # the watched directory itself
+                dirty.add(path)
+        return overflow
+
+    def __remove(self, path: str, events: List["watcher.event"]):
+        '''remove path and its subtree, unwatch removed directories'''
+        stack = [path]
+        while stack:
+            sub = stack.pop()
+            obj = self.__discard(sub)
+            if obj is not None:
+                events.append(watcher.event(EVENT_REMOVED, obj))
+            stack.extend(self.__children.pop(sub, ()))
+            wd = self.__wdindex.pop(sub, None)
+            if wd is not None:
+                self.__inotify.rm_watch(wd)
+                del self.__wds[wd]
+
+    def __update(self, path: str, events: List["watcher.event"]):
+        old: Optional[scanner.object] = self.__scanner[path] \
+            if path in self.__scanner else None
+        obj = scanner.object(path)
+        try:
+            obj.stat  # pylint: disable=W0104
+        except FileNotFoundError:  # or broken symbolic link
+            if old is not None:
+                self.__remove(path, events)
+            return
+        except OSError as error:
+            self.__cmds.logger.warning("watch %s error: %s", path, error)
+            return
+        if path in self.__filter or (self.__handler is not None and
+                                     self.__handler(obj) is not True):
+            return
+        if old is not None:
+            if not scanner.is_modified(old, obj):
+                return
+            if old.isdir != obj.isdir or old.islink != obj.islink:
+                self.__remove(path, events)  # type changed
+            else:
+                self.__scanner.remove(path)
+                self.__add(obj)
+                events.append(watcher.event(EVENT_MODIFIED, obj))
+                return
+        if obj.isdir and (self.__linkdir or not obj.islink):
+            for sub in self.__walk([path]):  # may be created with entries
+                if sub.path not in self.__scanner:
+                    self.__add(sub)
+                    events.append(watcher.event(EVENT_ADDED, sub))
+            return
+        self.__add(obj)
+        events.append(watcher.event(EVENT_ADDED, obj))
+
+    def __rescan(self) -> List["watcher.event"]:
+        self.__cmds.logger.warning("watch queue overflow, rescan %s",
+                                   self.__paths)
+        for wd in list(self.__wds):
+            self.__inotify.rm_watch(wd)
+        self.__wds.clear()
+        self.__wdindex.clear()
+        objects, changes = scanner.refresh(
+            self.__scanner, exclude=self.__exclude, linkdir=self.__linkdir,
+            threads=self.__threads, handler=self.__handler, restat=True)
+        events: List[watcher.event] = []
+        for obj in changes.removed:
+            self.__discard(obj.path)
+            self.__children.pop(obj.path, None)
+            events.append(watcher.event(EVENT_REMOVED, obj))
+        for kind, objs in ((EVENT_ADDED, changes.added),
+                           (EVENT_MODIFIED, changes.modified)):
+            for obj in objs:
+                self.__scanner.remove(obj.path)
+                self.__add(obj)
+                events.append(watcher.event(kind, obj))
+        for obj in objects.dirs:
+            self.__watch(obj)
+        return events
+
+    def poll(self, timeout: Optional[float] = None) -> List["watcher.event"]:
+        '''wait up to `timeout` seconds (forever if None) for a burst of
+        events, apply and return the coalesced changes
+        '''
+        fd = self.__inotify.fd
+        if not select([fd], [], [], timeout)[0]:
+            return []
+        dirty: Set[str] = set()
+        overflow = False
+        deadline = time() + self.__max_latency
+        while True:
+            overflow = self.__read(dirty) or overflow
+            wait = min(self.__latency, deadline - time())
+            if wait <= 0 or not select([fd], [], [], wait)[0]:
+                break
+        if overflow:
+            return self.__rescan()
+        events: List[watcher.event] = []
+        # parents first, a new directory is walked once
+        for path in sorted(dirty, key=lambda p: (p.count(os.sep), p)):
+            self.__update(path, events)
+        return events
+
+    def events(self, timeout: Optional[float] = None
+               ) -> Generator["watcher.event", None, None]:
+        '''stream of change events, stop if no event within `timeout`
+        seconds (never if None)
+        '''
+        while True:
+            if not select([self.__inotify.fd], [], [], timeout)[0]:
+                if timeout is not None:
+                    return
+                continue
+            yield from self.poll(0)